@@ -1,9 +1,19 @@
 import os
 import time
 import json
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .token_cache import drop_cached_token, load_cached_token, store_cached_token, token_cache_key
+
+
+# OAuth 访问令牌磁盘缓存（按 AK/SK 哈希区分，读写见 token_cache），短命进程复用令牌，免去每次启动的一次换取请求
+_TOKEN_CACHE_PATH = Path(
+    os.getenv("BAIDU_TOKEN_CACHE") or Path.home() / ".cache" / "baidu_ernie_token.json"
+)
 
 
 class BaiduErnieClient:
@@ -12,10 +22,13 @@ class BaiduErnieClient:
 
     - Retrieves and caches access_token using API key and secret key from env vars
     - Provides a simple chat_completions wrapper with retries
+    - Reuses pooled keep-alive connections via a requests.Session
     """
 
     TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
     CHAT_URL = "https://qianfan.baidubce.com/v2/chat/completions"
+    # 连接池大小：并发修复/生成时各线程复用 keep-alive 连接
+    POOL_SIZE = 16
 
     def __init__(
         self,
@@ -24,6 +37,7 @@ class BaiduErnieClient:
         max_retries: int = 5,
         retry_delay_seconds: float = 2.0,
         request_timeout_seconds: float = 0.0,
+        session: Optional[requests.Session] = None,
     ) -> None:
         self.api_key = api_key or os.getenv("BAIDU_API_KEY", "")
         self.secret_key = secret_key or os.getenv("BAIDU_SECRET_KEY", "")
@@ -40,8 +54,30 @@ class BaiduErnieClient:
         else:
             self.request_timeout_seconds = float(os.getenv("BAIDU_HTTP_TIMEOUT", "300"))
 
+        # 复用 TCP/TLS 连接，避免每次请求重新握手；重试仍由 chat_completions 自己负责，这里不挂 urllib3 重试。
+        # 传入的共享 session 由传入方关闭
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            session.mount(
+                "https://",
+                HTTPAdapter(pool_connections=2, pool_maxsize=self.POOL_SIZE),
+            )
+        self._session = session
+
         self._access_token: Optional[str] = None
         self._access_token_expiry_epoch: float = 0.0
+        self._token_cache_key = token_cache_key(self.api_key, self.secret_key)
+        if not self._direct_access_token_mode:
+            cached = load_cached_token(_TOKEN_CACHE_PATH, self._token_cache_key)
+            if cached is not None:
+                self._access_token = cached["access_token"]
+                self._access_token_expiry_epoch = float(cached.get("expiry", 0.0))
+
+    def close(self) -> None:
+        """关闭连接池（共享的 session 由传入方关闭）"""
+        if self._owns_session:
+            self._session.close()
 
     def _now(self) -> float:
         return time.time()
@@ -66,7 +102,7 @@ class BaiduErnieClient:
             "client_id": self.api_key,
             "client_secret": self.secret_key,
         }
-        response = requests.post(self.TOKEN_URL, params=params, timeout=self.request_timeout_seconds)
+        response = self._session.post(self.TOKEN_URL, params=params, timeout=self.request_timeout_seconds)
         response.raise_for_status()
         data = response.json()
         token = data.get("access_token")
@@ -76,8 +112,17 @@ class BaiduErnieClient:
 
         self._access_token = token
         self._access_token_expiry_epoch = self._now() + float(expires_in)
+        store_cached_token(
+            _TOKEN_CACHE_PATH, self._token_cache_key, token, self._access_token_expiry_epoch
+        )
         return token
 
+    def _invalidate_token(self) -> None:
+        self._access_token = None
+        self._access_token_expiry_epoch = 0.0
+        if not self._direct_access_token_mode:
+            drop_cached_token(_TOKEN_CACHE_PATH, self._token_cache_key)
+
     def chat_completions(
         self,
         model: str,
@@ -128,7 +173,7 @@ class BaiduErnieClient:
                 last_status = None
                 last_text = None
                 for url, headers in candidate_requests:
-                    resp = requests.post(
+                    resp = self._session.post(
                         url,
                         data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
                         headers=headers,
@@ -146,7 +191,9 @@ class BaiduErnieClient:
                     data = resp.json()
                     break
                 else:
-                    # 若两种方式都未通过，则抛出最后一次的详细响应
+                    # 若两种方式都未通过，则抛出最后一次的详细响应；缓存的令牌可能已失效，下次重试重新换取
+                    if last_status in (401, 403):
+                        self._invalidate_token()
                     raise RuntimeError(f"HTTP {last_status}: {last_text}")
                 if resp.status_code == 429:
                     # rate limit; backoff and retry
@@ -157,8 +204,7 @@ class BaiduErnieClient:
                 error_msg = str(data)
                 if "Access token expired" in error_msg:
                     # force refresh
-                    self._access_token = None
-                    self._access_token_expiry_epoch = 0.0
+                    self._invalidate_token()
                     time.sleep(self.retry_delay_seconds * (2 ** attempt))
                     continue
                 if "rate limit" in error_msg.lower():
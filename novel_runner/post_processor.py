@@ -5,6 +5,31 @@ import re
 from typing import List
 
 
+# 整行移除的模式（合并为一个预编译正则，对 strip 后的行做匹配）
+_REMOVE_LINE_RE = re.compile("|".join((
+    r'^下一章[:：]',  # 下一章预告
+    r'^第[一二三四五六七八九十\d]+章',  # 章节标题（数字或中文数字）
+    r'^---+$',  # 分隔符
+    r'^===+$',  # 分隔符
+    r'^\*\*\*+$',  # 分隔符
+    r'^【.*】$',  # 带方括号的标题
+    r'^写作意图[:：]',  # 写作意图
+    r'^\s*$',  # 空行（后续会重新整理）
+)))
+
+# 元信息关键词：短行中出现即视为元信息
+_META_KEYWORDS = (
+    '下一章', '写作意图', '章节目标', '提示词', '大纲',
+    '总结', '概要', 'Chapter', 'CHAPTER', '分隔符'
+)
+# 末行元信息词汇
+_META_ENDINGS = ('写作', '意图', '下章', '下一章', '预告')
+
+# 概要行首的编号与符号
+_SUMMARY_BULLET_RE = re.compile(r'^[\d\-\*\•\.]+\s*')
+_SUMMARY_META_KEYWORDS = ('概要', '提要', '总结', '如下')
+
+
 def clean_chapter_text(raw_text: str) -> str:
     """
     清理章节文本，移除所有非小说内容
@@ -21,39 +46,18 @@ def clean_chapter_text(raw_text: str) -> str:
     lines = raw_text.strip().split('\n')
     cleaned_lines = []
     
-    # 要移除的模式
-    remove_patterns = [
-        r'^下一章[:：]',  # 下一章预告
-        r'^第[一二三四五六七八九十\d]+章',  # 章节标题（数字或中文数字）
-        r'^---+$',  # 分隔符
-        r'^===+$',  # 分隔符
-        r'^\*\*\*+$',  # 分隔符
-        r'^【.*】$',  # 带方括号的标题
-        r'^写作意图[:：]',  # 写作意图
-        r'^\s*$',  # 空行（后续会重新整理）
-    ]
-    
-    # 检测是否为元信息行
-    meta_keywords = [
-        '下一章', '写作意图', '章节目标', '提示词', '大纲',
-        '总结', '概要', 'Chapter', 'CHAPTER', '分隔符'
-    ]
+    remove_line = _REMOVE_LINE_RE.match
     
     for line in lines:
+        stripped = line.strip()
         # 跳过匹配移除模式的行
-        should_skip = False
-        for pattern in remove_patterns:
-            if re.match(pattern, line.strip()):
-                should_skip = True
-                break
-        
-        if should_skip:
+        if remove_line(stripped):
             continue
         
         # 跳过包含元信息关键词的行（通常在末尾）
-        if any(keyword in line for keyword in meta_keywords):
+        if any(keyword in line for keyword in _META_KEYWORDS):
             # 如果这行很短（小于50字符），很可能是元信息
-            if len(line.strip()) < 50:
+            if len(stripped) < 50:
                 continue
         
         # 保留正常的小说内容
@@ -81,8 +85,7 @@ def clean_chapter_text(raw_text: str) -> str:
         last_line = result_lines[-1].strip()
         if len(last_line) < 50:
             # 检查是否包含常见的元信息词汇
-            meta_endings = ['。', '写作', '意图', '下章', '下一章', '预告']
-            if any(word in last_line for word in meta_endings[1:]):
+            if any(word in last_line for word in _META_ENDINGS):
                 # 如果最后一行看起来像元信息，移除它
                 result_lines.pop()
     
@@ -110,14 +113,14 @@ def extract_clean_summary(raw_summary: str) -> List[str]:
         cleaned = line.strip()
         
         # 移除编号和符号
-        cleaned = re.sub(r'^[\d\-\*\•\.]+\s*', '', cleaned)
+        cleaned = _SUMMARY_BULLET_RE.sub('', cleaned)
         
         # 跳过空行和过短的行
         if len(cleaned) < 5:
             continue
         
         # 跳过元信息
-        if any(keyword in cleaned for keyword in ['概要', '提要', '总结', '如下']):
+        if any(keyword in cleaned for keyword in _SUMMARY_META_KEYWORDS):
             if len(cleaned) < 20:  # 短的元信息行
                 continue
         
@@ -1,9 +1,12 @@
 import argparse
+import itertools
 import json
 import logging
 import os
+import queue
 import re
 import sys
+import threading
 import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
@@ -42,6 +45,9 @@ SUMMARIES_DIR = os.path.join(OUTPUT_ROOT, "summaries")
 LOGS_DIR = os.path.join(OUTPUT_ROOT, "logs")
 STATE_PATH = os.path.join(OUTPUT_ROOT, "state.json")
 
+# 请求/响应快照仅用于内部排序，使用单调序号；面向人工查看的 state 仍记录墙钟时间
+_LOG_SEQ = itertools.count()
+
 
 def ensure_dirs() -> None:
     logger.info("创建输出目录...")
@@ -66,7 +72,9 @@ def sanitize_filename(title: str, chapter_number: int) -> str:
 def read_blueprint() -> Dict[str, Any]:
     # 动态 import Python 蓝图，获取 story_blueprint 变量
     logger.info("加载故事蓝图...")
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if root not in sys.path:
+        sys.path.insert(0, root)
     from 调频.上部_失谐_创作蓝图 import story_blueprint  # type: ignore
     
     chapters_count = len(story_blueprint.get("story_blueprint", {}).get("chapters", []))
@@ -93,8 +101,13 @@ def load_state() -> Dict[str, Any]:
 
 
 def save_state(state: Dict[str, Any]) -> None:
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
+    # 先写临时文件再原子替换，避免中途崩溃留下残缺的 state.json 导致无法续跑
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(state, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, STATE_PATH)
 
 
 def load_existing_summary(label: str) -> Optional[str]:
@@ -155,6 +168,28 @@ def build_system_prompt(genre_label: str, world_brief: str) -> str:
     return system_prompt
 
 
+# 当前章节指令模板：(蓝图键, 行前缀)，按顺序渲染，值为 None 的字段跳过
+_CHAPTER_TEMPLATE: Tuple[Tuple[str, str], ...] = (
+    ("chapter_number", "编号: "),
+    ("title_suggestion", "标题建议: "),
+    ("narrative_arc", "叙事弧: "),
+    ("core_plot_points", "核心情节要点: "),
+    ("setting", "场景: "),
+    ("purpose_in_story", "本章目的: "),
+    ("starts_from", "从此处开场: "),
+    ("ending_hook", "建议结尾悬念: "),
+)
+
+
+def render_chapter_block(ch: Dict[str, Any]) -> str:
+    get = ch.get
+    return "\n".join([
+        prefix + str(value)
+        for key, prefix in _CHAPTER_TEMPLATE
+        if (value := get(key)) is not None
+    ])
+
+
 def build_user_prompt(
     chapter: Dict[str, Any],
     character_dossier: Dict[str, Any],
@@ -170,17 +205,7 @@ def build_user_prompt(
             cards.append(json.dumps({name: role}, ensure_ascii=False, indent=2))
     cards_text = "\n".join(cards)
 
-    fields = [
-        ("编号", chapter.get("chapter_number")),
-        ("标题建议", chapter.get("title_suggestion")),
-        ("叙事弧", chapter.get("narrative_arc")),
-        ("核心情节要点", chapter.get("core_plot_points")),
-        ("场景", chapter.get("setting")),
-        ("本章目的", chapter.get("purpose_in_story")),
-        ("从此处开场", chapter.get("starts_from")),
-        ("建议结尾悬念", chapter.get("ending_hook")),
-    ]
-    chapter_block = "\n".join(f"{k}: {v}" for k, v in fields if v is not None)
+    chapter_block = render_chapter_block(chapter)
 
     user_prompt = (
         f"[此前剧情回顾]\n{history_block}\n\n"
@@ -250,7 +275,8 @@ def call_llm(
     
     # 追溯日志保存
     req_log = {
-        "timestamp": datetime.now().isoformat(),
+        "seq": next(_LOG_SEQ),
+        "ts_monotonic": time.monotonic(),
         "model": model_name,
         "system_prompt": system_prompt,
         "user_prompt": user_prompt,
@@ -280,7 +306,8 @@ def call_llm(
 
     # 响应日志
     resp_log = {
-        "timestamp": datetime.now().isoformat(),
+        "seq": next(_LOG_SEQ),
+        "ts_monotonic": time.monotonic(),
         "model": resp.model,
         "finish_reason": resp.finish_reason,
         "usage": resp.usage,
@@ -307,6 +334,96 @@ def count_chinese_chars(text: str) -> int:
     return len(re.findall(r"[\u4e00-\u9fff]", text))
 
 
+def _stage_of(chapter_number: int) -> Tuple[str, int]:
+    """返回章节所属阶段的 (总结标签, 阶段起始章)：1-20、21-40、41-60、61 及以后。"""
+    if chapter_number <= 20:
+        return "01-20", 1
+    if chapter_number <= 40:
+        return "21-40", 21
+    if chapter_number <= 60:
+        return "41-60", 41
+    return "61-68", 61
+
+
+def _summary_labels_for(chapter_number: int, summaries: Dict[str, str]) -> List[str]:
+    """返回构造第 chapter_number 章历史回顾时应装入的阶段总结标签。"""
+    labels: List[str] = []
+    if "01-20" in summaries and chapter_number >= 21:
+        labels.append("01-20")
+    if "21-40" in summaries and chapter_number >= 41:
+        labels.append("21-40")
+    if "41-60" in summaries and chapter_number >= 61:
+        labels.append("41-60")
+    return labels
+
+
+def prepare_chapter_prompt(
+    idx: int,
+    chapters: List[Dict[str, Any]],
+    character_dossier: Dict[str, Any],
+    summaries: Dict[str, str],
+) -> Dict[str, Any]:
+    """组装单章的历史回顾与用户提示词（纯本地计算，可在后台线程中执行）。"""
+    chapter = chapters[idx]
+    chapter_number = int(chapter.get("chapter_number", idx + 1))
+    involved = str(chapter.get("main_focus_characters", "")).split()
+    involved = [name.strip() for name in involved if name.strip()]
+
+    # 构造历史回顾块：根据当前进度与已有总结拼接
+    history_parts: List[str] = []
+
+    # 阶段总结装入（若存在）
+    summary_used = _summary_labels_for(chapter_number, summaries)
+    for label in summary_used:
+        history_parts.append(summaries[label])
+
+    # 追加最近未总结章节 core_plot_points 原文（例如 41~(n-1)）：从本阶段起始章开始
+    start_unrolled = _stage_of(chapter_number)[1]
+
+    individual_chapters = []
+    for j in range(start_unrolled, chapter_number):
+        cp = chapters[j - 1].get("core_plot_points")
+        if cp:
+            history_parts.append(str(cp))
+            individual_chapters.append(j)
+
+    history_block = "\n\n".join(history_parts)
+    user_prompt = build_user_prompt(
+        chapter=chapter,
+        character_dossier=character_dossier,
+        involved_characters=involved,
+        history_block=history_block,
+    )
+    return {
+        "involved": involved,
+        "summary_used": summary_used,
+        "summary_texts": [summaries[label] for label in summary_used],
+        "individual_chapters": individual_chapters,
+        "history_length": len(history_block),
+        "user_prompt": user_prompt,
+        "logs_key": f"chapter_{chapter_number:02d}",
+    }
+
+
+def _prompt_producer(
+    indices: List[int],
+    prompt_q: "queue.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[BaseException]]]",
+    chapters: List[Dict[str, Any]],
+    character_dossier: Dict[str, Any],
+    summaries_snapshot: List[Tuple[Tuple[str, str], ...]],
+) -> None:
+    # 在主线程等待 LLM 响应期间，预先组装后续章节的提示词。
+    # 不读主线程正在修改的 summaries 字典：主线程每次更新总结后把 summaries_snapshot[0]
+    # 整体换成新的不可变快照，这里每章取一次当前快照
+    for idx in indices:
+        try:
+            summaries = dict(summaries_snapshot[0])
+            prompt_q.put((idx, prepare_chapter_prompt(idx, chapters, character_dossier, summaries), None))
+        except BaseException as e:  # noqa: BLE001
+            prompt_q.put((idx, None, e))
+            return
+
+
 def run(args: argparse.Namespace) -> None:
     logger.info("=== 调频-失谐 长篇生成器启动 ===")
     ensure_dirs()
@@ -343,71 +460,48 @@ def run(args: argparse.Namespace) -> None:
         if s:
             summaries[label] = s
 
-    for i, idx in enumerate(indices, 1):
+    # 系统提示词各章相同，只构造一次
+    system_prompt = build_system_prompt("科幻", world_brief)
+
+    # 生产者线程预构造提示词，与 LLM 网络等待重叠；阶段总结以不可变快照传给生产者
+    summaries_snapshot = [tuple(summaries.items())]
+    prompt_q: "queue.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[BaseException]]]" = queue.Queue(maxsize=4)
+    threading.Thread(
+        target=_prompt_producer,
+        args=(indices, prompt_q, chapters, character_dossier, summaries_snapshot),
+        daemon=True,
+    ).start()
+
+    for i, _ in enumerate(indices, 1):
+        idx, prepared, producer_err = prompt_q.get()
+        if producer_err is not None:
+            raise producer_err
         chapter = chapters[idx]
         chapter_number = int(chapter.get("chapter_number", idx + 1))
         title = str(chapter.get("title_suggestion", f"第{chapter_number}章"))
-        involved = str(chapter.get("main_focus_characters", "")).split()
-        involved = [name.strip() for name in involved if name.strip()]
-        
+
+        # 预构造时阶段总结可能尚未生成或已被重写（如第20章后才产出 01-20），此时同步重建
+        current_labels = _summary_labels_for(chapter_number, summaries)
+        if prepared["summary_texts"] != [summaries[label] for label in current_labels]:
+            prepared = prepare_chapter_prompt(idx, chapters, character_dossier, summaries)
+        involved = prepared["involved"]
+
         logger.info(f"\n{'='*60}")
         logger.info(f"开始生成第 {chapter_number} 章: {title}")
         logger.info(f"进度: {i}/{len(indices)} ({i/len(indices)*100:.1f}%)")
         logger.info(f"涉及角色: {', '.join(involved) if involved else '无'}")
         logger.info(f"{'='*60}")
 
-        # 构造历史回顾块：根据当前进度与已有总结拼接
-        logger.info("构建历史回顾上下文...")
-        history_parts: List[str] = []
-        
-        # 阶段总结装入（若存在）
-        summary_used = []
-        if "01-20" in summaries and chapter_number >= 21:
-            history_parts.append(summaries["01-20"])
-            summary_used.append("01-20")
-        if "21-40" in summaries and chapter_number >= 41:
-            history_parts.append(summaries["21-40"])
-            summary_used.append("21-40")
-        if "41-60" in summaries and chapter_number >= 61:
-            history_parts.append(summaries["41-60"])
-            summary_used.append("41-60")
-        
+        summary_used = prepared["summary_used"]
         if summary_used:
             logger.info(f"使用阶段总结: {', '.join(summary_used)}")
-        
-        # 追加最近未总结章节 core_plot_points 原文（例如 41~(n-1)）
-        # 计算未总结起点
-        if chapter_number <= 20:
-            start_unrolled = 1
-        elif 21 <= chapter_number <= 40:
-            start_unrolled = 21
-        elif 41 <= chapter_number <= 60:
-            start_unrolled = 41
-        else:
-            start_unrolled = 61
-            
-        individual_chapters = []
-        for j in range(start_unrolled, chapter_number):
-            cp = chapters[j - 1].get("core_plot_points")
-            if cp:
-                history_parts.append(str(cp))
-                individual_chapters.append(j)
-        
+        individual_chapters = prepared["individual_chapters"]
         if individual_chapters:
             logger.info(f"添加未总结章节要点: 第{individual_chapters[0]}到第{individual_chapters[-1]}章")
-        
-        history_block = "\n\n".join(history_parts)
-        logger.info(f"历史回顾构建完成，总长度: {len(history_block)}字符")
-
-        system_prompt = build_system_prompt("科幻", world_brief)
-        user_prompt = build_user_prompt(
-            chapter=chapter,
-            character_dossier=character_dossier,
-            involved_characters=involved,
-            history_block=history_block,
-        )
+        logger.info(f"历史回顾构建完成，总长度: {prepared['history_length']}字符")
 
-        logs_key = f"chapter_{chapter_number:02d}"
+        user_prompt = prepared["user_prompt"]
+        logs_key = prepared["logs_key"]
 
         # 调用，失败重试一次
         attempt = 0
@@ -482,18 +576,7 @@ def run(args: argparse.Namespace) -> None:
             logger.info(f"{'*'*50}")
             
             # 汇总该阶段的 core_plot_points 原文
-            if chapter_number == 20:
-                label = "01-20"
-                start_k = 1
-            elif chapter_number == 40:
-                label = "21-40"
-                start_k = 21
-            elif chapter_number == 60:
-                label = "41-60"
-                start_k = 41
-            else:
-                label = "61-68"
-                start_k = 61
+            label, start_k = _stage_of(chapter_number)
 
             logger.info(f"汇总第 {start_k} 到第 {chapter_number} 章的核心要点...")
             segment_points = []
@@ -545,6 +628,7 @@ def run(args: argparse.Namespace) -> None:
             base_name = f"summary_{label}.txt"
             path = write_text_with_conflict(SUMMARIES_DIR, base_name, summary_text)
             summaries[label] = summary_text
+            summaries_snapshot[0] = tuple(summaries.items())
             logger.info(f"阶段总结已保存: {path}")
             
             # 更新状态
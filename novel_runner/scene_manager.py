@@ -3,10 +3,12 @@
 """
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
+from functools import cached_property
 import random
+import sys
 
 
-@dataclass
+@dataclass(slots=True)
 class Scene:
     """场景定义"""
     name: str
@@ -18,15 +20,45 @@ class Scene:
     props: List[str] = field(default_factory=list)  # 道具
     mood_impact: str = ""  # 对情绪的影响
     symbolism: str = ""  # 象征意义
+    # 随机取材用的预计算元组，避免每次描写都查字典
+    _visual: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+    _touch: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+    _props: Tuple[str, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # 类别/时间/天气等短字符串在场景间大量重复，驻留后共享同一对象
+        self.location_type = sys.intern(self.location_type)
+        self.time_of_day = sys.intern(self.time_of_day)
+        self.weather = sys.intern(self.weather)
+        self.sensory_details = {
+            sys.intern(sense): [sys.intern(d) for d in details]
+            for sense, details in self.sensory_details.items()
+        }
+        self._visual = tuple(self.sensory_details.get("视觉", ()))
+        self._touch = tuple(self.sensory_details.get("触觉", ()))
+        self._props = tuple(self.props)
 
 
 class SceneManager:
     """场景和情节节奏管理"""
     
     def __init__(self):
-        self.scenes = self._init_romance_scenes()
-        self.plot_rhythm = self._init_plot_rhythm()
-        self.scene_transitions = self._init_transitions()
+        # 每类转场最近用过的选项位图（第 i 位 = 第 i 条近期已用），用于降低重复概率
+        self._transition_recent: Dict[str, int] = {}
+        self._scene_prompt_cache: Dict[int, str] = {}
+    
+    # 场景、节奏与转场表在首次访问时才构造
+    @cached_property
+    def scenes(self) -> Dict[str, Scene]:
+        return self._init_romance_scenes()
+    
+    @cached_property
+    def plot_rhythm(self) -> Dict[int, Dict]:
+        return self._init_plot_rhythm()
+    
+    @cached_property
+    def scene_transitions(self) -> Dict[str, List[str]]:
+        return self._init_transitions()
     
     def _init_romance_scenes(self) -> Dict[str, Scene]:
         """初始化追妻流常用场景"""
@@ -294,25 +326,30 @@ class SceneManager:
         description.append(f"{time or scene.time_of_day}，{scene.name}。")
         
         # 添加感官细节
-        if "视觉" in scene.sensory_details:
-            visual = random.choice(scene.sensory_details["视觉"])
-            description.append(visual)
+        visual = scene._visual
+        if visual:
+            description.append(visual[random.randrange(len(visual))])
         
-        if emotion == "悲伤" and "触觉" in scene.sensory_details:
-            touch = random.choice(scene.sensory_details["触觉"])
-            description.append(touch)
+        touch = scene._touch
+        if emotion == "悲伤" and touch:
+            description.append(touch[random.randrange(len(touch))])
         
         # 添加氛围
         if scene.atmosphere:
             description.append(f"整个空间弥漫着{scene.atmosphere}的气息。")
         
         # 添加道具细节
-        if scene.props:
-            prop = random.choice(scene.props)
-            description.append(f"{prop}静静地诉说着过往。")
+        props = scene._props
+        if props:
+            description.append(f"{props[random.randrange(len(props))]}静静地诉说着过往。")
         
         return " ".join(description)
     
+    def get_scene_descriptions_batch(self, scene_names: List[str], emotion: str = "") -> List[str]:
+        """批量获取场景描写，结果顺序与 scene_names 一致，未知场景返回空字符串"""
+        describe = self.get_scene_description
+        return [describe(name, emotion) for name in scene_names]
+    
     def get_chapter_rhythm(self, chapter: int) -> Dict:
         """获取章节的节奏控制"""
         return self.plot_rhythm.get(chapter, {
@@ -324,10 +361,19 @@ class SceneManager:
         })
     
     def get_transition(self, transition_type: str) -> str:
-        """获取场景转换语句"""
-        if transition_type in self.scene_transitions:
-            return random.choice(self.scene_transitions[transition_type])
-        return ""
+        """获取场景转换语句（近期用过的选项权重降为 1/4）"""
+        options = self.scene_transitions.get(transition_type)
+        if not options:
+            return ""
+        mask = self._transition_recent.get(transition_type, 0)
+        weights = [0.25 if (mask >> i) & 1 else 1.0 for i in range(len(options))]
+        idx = random.choices(range(len(options)), weights=weights, k=1)[0]
+        mask |= 1 << idx
+        # 全部用过一轮后只保留本次选择，重新开始计算
+        if mask == (1 << len(options)) - 1:
+            mask = 1 << idx
+        self._transition_recent[transition_type] = mask
+        return options[idx]
     
     def suggest_scene_sequence(self, chapter: int) -> List[Tuple[str, str]]:
         """建议章节的场景序列"""
@@ -362,22 +408,30 @@ class SceneManager:
         return suggestions
     
     def get_scene_prompt(self, chapter: int) -> str:
-        """生成场景描写提示"""
+        """生成场景描写提示（只依赖静态节奏/场景表，按章节缓存）"""
+        cached = self._scene_prompt_cache.get(chapter)
+        if cached is not None:
+            return cached
+        
         rhythm = self.get_chapter_rhythm(chapter)
         scenes = self.suggest_scene_sequence(chapter)
         
-        prompt = f"本章节奏：{rhythm['pace']}，情绪强度：{rhythm['intensity']}/10\n"
-        prompt += f"情感高潮：{rhythm['emotion_peak']}\n"
-        prompt += f"关键场景：{', '.join(rhythm['key_scenes'])}\n"
+        parts = [
+            f"本章节奏：{rhythm['pace']}，情绪强度：{rhythm['intensity']}/10\n",
+            f"情感高潮：{rhythm['emotion_peak']}\n",
+            f"关键场景：{', '.join(rhythm['key_scenes'])}\n",
+        ]
         
         if scenes:
-            prompt += "\n建议场景序列：\n"
+            parts.append("\n建议场景序列：\n")
             for scene, purpose in scenes:
                 scene_obj = self.scenes.get(scene)
                 if scene_obj:
-                    prompt += f"- {scene}（{purpose}）：{scene_obj.atmosphere}\n"
+                    parts.append(f"- {scene}（{purpose}）：{scene_obj.atmosphere}\n")
         
         if rhythm.get('cliffhanger'):
-            prompt += f"\n章节悬念：{rhythm['cliffhanger']}"
+            parts.append(f"\n章节悬念：{rhythm['cliffhanger']}")
         
-        return prompt
\ No newline at end of file
+        prompt = "".join(parts)
+        self._scene_prompt_cache[chapter] = prompt
+        return prompt
@@ -1,13 +1,155 @@
 """
 故事管理器 - 管理人物档案、剧情线索和世界观设定
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Iterator
+from collections.abc import MutableMapping, MutableSequence
 from dataclasses import dataclass, field
 from pathlib import Path
+from bisect import bisect_right
+from itertools import accumulate
+from operator import attrgetter
+import heapq
 import json
+import os
+import re
 
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # 可选依赖 pyahocorasick，缺失时退回逐行扫描
+    ahocorasick = None
 
-@dataclass
+try:
+    import orjson  # type: ignore
+except ImportError:  # 可选依赖 orjson，缺失时使用标准库 json
+    orjson = None
+
+
+# 进入上下文的人物角色
+_ACTIVE_ROLES = frozenset(("主角", "重要配角"))
+
+# 存档中除章节号外的顶层段，按写出顺序排列
+_STATE_SECTIONS = ("characters", "plot_threads", "world_details", "chapter_summaries")
+_ORJSON_OPTION = (orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+# 章节分析关键词：类别 -> 触发词
+_UPDATE_KEYWORDS: Dict[str, tuple] = {
+    "new_characters": ("结识", "遇见", "认识"),
+    "new_locations": ("来到", "抵达", "前往"),
+    "new_items": ("得到", "获得", "发现"),
+}
+
+
+def _build_keyword_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for category, words in _UPDATE_KEYWORDS.items():
+        for word in words:
+            automaton.add_word(word, (category, word))
+    automaton.make_automaton()
+    return automaton
+
+
+_KW_AUTOMATON = _build_keyword_automaton()
+
+_KW_PATTERNS: Dict[str, "re.Pattern[str]"] = {
+    category: re.compile("|".join(map(re.escape, words)))
+    for category, words in _UPDATE_KEYWORDS.items()
+}
+
+
+def _dataclass_to_dict(obj: Any) -> Dict[str, Any]:
+    """json.dump 的 default 钩子：导出 dataclass 的公开字段（与 orjson 行为一致）"""
+    fields = getattr(obj, "__dataclass_fields__", None)
+    if fields is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return {name: getattr(obj, name) for name in fields if not name.startswith("_")}
+
+
+class _SummaryLines(MutableSequence):
+    """某一章概要的列表视图：读取扁平存储，修改（append、赋值、删除等）后整章写回 StoryManager"""
+
+    __slots__ = ("_manager", "_chapter")
+
+    def __init__(self, manager: "StoryManager", chapter: int):
+        self._manager = manager
+        self._chapter = chapter
+
+    def _lines(self) -> List[str]:
+        return self._manager._summary_lines(self._chapter)
+
+    def _write(self, lines: List[str]) -> None:
+        self._manager.add_chapter_summary(self._chapter, lines)
+
+    def __getitem__(self, index):
+        return self._lines()[index]
+
+    def __len__(self) -> int:
+        start, end = self._manager._summary_spans[self._chapter]
+        return end - start
+
+    def __setitem__(self, index, value) -> None:
+        lines = self._lines()
+        lines[index] = value
+        self._write(lines)
+
+    def __delitem__(self, index) -> None:
+        lines = self._lines()
+        del lines[index]
+        self._write(lines)
+
+    def insert(self, index: int, value: str) -> None:
+        lines = self._lines()
+        lines.insert(index, value)
+        self._write(lines)
+
+    def extend(self, values) -> None:
+        # 一次写回，而不是逐条 append
+        self._write(self._lines() + list(values))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, _SummaryLines)):
+            return self._lines() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self._lines())
+
+
+class _SummaryView(MutableMapping):
+    """章节概要视图：章节号 -> 概要列表（_SummaryLines），按 Dict[int, List[str]] 的方式读写，
+    不复制整张表；写入经 StoryManager.add_chapter_summary 落到扁平存储。"""
+
+    __slots__ = ("_manager",)
+
+    def __init__(self, manager: "StoryManager"):
+        self._manager = manager
+
+    def __getitem__(self, chapter: int) -> _SummaryLines:
+        if chapter not in self._manager._summary_spans:
+            raise KeyError(chapter)
+        return _SummaryLines(self._manager, chapter)
+
+    def __setitem__(self, chapter: int, lines: List[str]) -> None:
+        self._manager.add_chapter_summary(chapter, lines)
+
+    def __delitem__(self, chapter: int) -> None:
+        self._manager.remove_chapter_summary(chapter)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._manager._summary_spans)
+
+    def __len__(self) -> int:
+        return len(self._manager._summary_spans)
+
+    def __repr__(self) -> str:
+        return repr(self._manager._summaries_dict())
+
+
+@dataclass(slots=True)
 class Character:
     """人物档案"""
     name: str
@@ -18,9 +160,21 @@ class Character:
     arc: str = ""  # 人物成长弧线
     current_state: str = ""  # 当前状态/心境
     key_items: List[str] = field(default_factory=list)  # 重要物品
+    # 提示词文本缓存，字段经 StoryManager 更新时置脏
+    _cached_prompt: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    
+    # 字段类型表（类属性，非 dataclass 字段），供 update_character 分派合并方式
+    _FIELD_KINDS = {
+        "name": "scalar", "role": "scalar", "arc": "scalar", "current_state": "scalar",
+        "personality": "list", "abilities": "list", "key_items": "list",
+        "relationships": "dict",
+    }
     
     def to_prompt_text(self) -> str:
         """转换为提示词文本"""
+        if not self._dirty:
+            return self._cached_prompt
         lines = [f"{self.name}（{self.role}）："]
         if self.personality:
             lines.append(f"  性格：{'、'.join(self.personality)}")
@@ -35,10 +189,12 @@ class Character:
             lines.append(f"  当前：{self.current_state}")
         if self.key_items:
             lines.append(f"  物品：{'、'.join(self.key_items)}")
-        return '\n'.join(lines)
+        self._cached_prompt = '\n'.join(lines)
+        self._dirty = False
+        return self._cached_prompt
 
 
-@dataclass
+@dataclass(slots=True)
 class PlotThread:
     """剧情线索"""
     name: str
@@ -46,16 +202,22 @@ class PlotThread:
     status: str = "进行中"  # 进行中/已解决/搁置
     key_events: List[str] = field(default_factory=list)
     related_characters: List[str] = field(default_factory=list)
+    _cached_prompt: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
     
     def to_prompt_text(self) -> str:
         """转换为提示词文本"""
+        if not self._dirty:
+            return self._cached_prompt
         lines = [f"【{self.name}】（{self.status}）：{self.description}"]
         if self.key_events:
             lines.append(f"  关键事件：{'→'.join(self.key_events[-3:])}")  # 只保留最近3个
-        return '\n'.join(lines)
+        self._cached_prompt = '\n'.join(lines)
+        self._dirty = False
+        return self._cached_prompt
 
 
-@dataclass 
+@dataclass(frozen=True, slots=True)
 class WorldDetail:
     """世界观细节"""
     category: str  # 地理/势力/法术体系/历史等
@@ -73,12 +235,28 @@ class StoryManager:
     def __init__(self, save_dir: Path):
         self.save_dir = save_dir
         self.save_dir.mkdir(parents=True, exist_ok=True)
+        # 状态文件路径模板，避免每次存取都拼接 Path
+        self._save_template = os.path.join(str(self.save_dir), "story_state_ch{:02d}.json")
         
-        # 核心数据结构
+        # 核心数据结构。人物/线索/世界观只能经 update_character、update_plot_thread、add_world_detail 等方法修改：
+        # 提示词与上下文缓存只在这些方法中失效，直接给字段赋值或原地修改列表/字典（不支持）会读到旧的提示词
         self.characters: Dict[str, Character] = {}
         self.plot_threads: Dict[str, PlotThread] = {}
         self.world_details: List[WorldDetail] = []
-        self.chapter_summaries: Dict[int, List[str]] = {}  # 章节号 -> 概要列表
+        # 章节概要扁平存放：所有行依次追加到 _summary_pool，章节号 -> [起, 止) 区间；
+        # 覆盖或删除某章后旧区间的行作废（_summary_dead 计数），作废行过半时压缩
+        self._summary_pool: List[str] = []
+        self._summary_spans: Dict[int, Tuple[int, int]] = {}
+        self._summary_dead = 0
+        # 需进入上下文的人物（重要角色或有当前状态），dict 作有序集合以保持输出顺序稳定
+        self._active_characters: Dict[str, None] = {}
+        
+        # 人物/线索/世界观的修改版本号；上下文中与章节无关的部分按版本号缓存
+        self._state_version: int = 0
+        self._ctx_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        # 存档各段的修改计数与已序列化结果：save_state 只重新序列化有变化的段
+        self._section_revs: Dict[str, int] = dict.fromkeys(_STATE_SECTIONS, 0)
+        self._section_bytes: Dict[str, Tuple[int, bytes]] = {}
         
         # 初始化基础设定
         self._init_base_settings()
@@ -94,6 +272,7 @@ class StoryManager:
             arc="从凡人到英雄的成长之路",
             current_state="初入异世"
         )
+        self._refresh_active("主角")
         
         # 核心剧情线
         self.plot_threads["主线"] = PlotThread(
@@ -109,33 +288,53 @@ class StoryManager:
             WorldDetail("势力", "仙门与朝廷", "修行门派与世俗朝廷相互制衡", 4),
         ])
     
+    def _touch(self, section: str) -> None:
+        """记录人物/线索/世界观某一段被修改：失效上下文缓存与该段的存档缓存"""
+        self._state_version += 1
+        self._section_revs[section] += 1
+    
+    def _refresh_active(self, name: str) -> None:
+        """根据角色与当前状态维护活跃人物集合"""
+        char = self.characters[name]
+        if char.role in _ACTIVE_ROLES or char.current_state:
+            self._active_characters.setdefault(name)
+        else:
+            self._active_characters.pop(name, None)
+    
     def update_character(self, name: str, updates: Dict[str, Any]):
         """更新人物信息"""
         if name not in self.characters:
             self.characters[name] = Character(name=name, role="配角")
         
         char = self.characters[name]
+        char._dirty = True
+        self._touch("characters")
+        field_kinds = Character._FIELD_KINDS
         for key, value in updates.items():
-            if hasattr(char, key):
-                if isinstance(getattr(char, key), list):
-                    current = getattr(char, key)
-                    if isinstance(value, list):
-                        current.extend(value)
-                    else:
-                        current.append(value)
-                elif isinstance(getattr(char, key), dict):
-                    getattr(char, key).update(value)
+            kind = field_kinds.get(key)
+            if kind == "list":
+                current = getattr(char, key)
+                if isinstance(value, list):
+                    current.extend(value)
                 else:
-                    setattr(char, key, value)
+                    current.append(value)
+            elif kind == "dict":
+                getattr(char, key).update(value)
+            elif kind == "scalar":
+                setattr(char, key, value)
+        self._refresh_active(name)
     
     def add_plot_thread(self, name: str, description: str, **kwargs):
         """添加新的剧情线索"""
         self.plot_threads[name] = PlotThread(name=name, description=description, **kwargs)
+        self._touch("plot_threads")
     
     def update_plot_thread(self, name: str, event: str = None, status: str = None):
         """更新剧情线索"""
         if name in self.plot_threads:
             thread = self.plot_threads[name]
+            thread._dirty = True
+            self._touch("plot_threads")
             if event:
                 thread.key_events.append(event)
             if status:
@@ -146,100 +345,172 @@ class StoryManager:
         self.world_details.append(
             WorldDetail(category, name, description, importance)
         )
+        self._touch("world_details")
     
     def add_chapter_summary(self, chapter: int, summary_lines: List[str]):
-        """添加章节概要"""
-        self.chapter_summaries[chapter] = summary_lines
+        """添加章节概要（已有该章时覆盖）"""
+        # 先复制：summary_lines 可能是本存储上的视图
+        lines = list(summary_lines)
+        pool = self._summary_pool
+        old = self._summary_spans.get(chapter)
+        if old is not None:
+            self._summary_dead += old[1] - old[0]
+        start = len(pool)
+        pool.extend(lines)
+        self._summary_spans[chapter] = (start, len(pool))
+        self._section_revs["chapter_summaries"] += 1
+        self._maybe_compact_summaries()
     
-    def get_context_for_chapter(self, chapter: int, window_size: int = 3) -> Dict[str, Any]:
-        """获取指定章节的上下文信息"""
-        context = {
-            "characters": {},
-            "plot_threads": {},
-            "world_details": [],
-            "recent_summaries": []
-        }
-        
+    def remove_chapter_summary(self, chapter: int) -> None:
+        """删除章节概要（不存在时抛 KeyError）"""
+        start, end = self._summary_spans.pop(chapter)
+        self._summary_dead += end - start
+        self._section_revs["chapter_summaries"] += 1
+        self._maybe_compact_summaries()
+    
+    def _maybe_compact_summaries(self) -> None:
+        """作废行超过池的一半时按现有区间重建池（均摊到每次覆盖为 O(1)）"""
+        if self._summary_dead * 2 <= len(self._summary_pool):
+            return
+        pool = self._summary_pool
+        new_pool: List[str] = []
+        for ch, (a, b) in self._summary_spans.items():
+            start = len(new_pool)
+            new_pool.extend(pool[a:b])
+            self._summary_spans[ch] = (start, len(new_pool))
+        self._summary_pool = new_pool
+        self._summary_dead = 0
+    
+    def _summary_lines(self, chapter: int) -> List[str]:
+        a, b = self._summary_spans[chapter]
+        return self._summary_pool[a:b]
+    
+    def _summaries_dict(self) -> Dict[int, List[str]]:
+        """章节号 -> 概要列表的普通字典（存档用）"""
+        pool = self._summary_pool
+        return {ch: pool[a:b] for ch, (a, b) in self._summary_spans.items()}
+    
+    @property
+    def chapter_summaries(self) -> MutableMapping:
+        """章节号 -> 概要列表（Dict[int, List[str]] 风格的视图，读写均直达扁平存储）"""
+        return _SummaryView(self)
+    
+    @chapter_summaries.setter
+    def chapter_summaries(self, summaries: Dict[int, List[str]]) -> None:
+        items = [(ch, list(lines)) for ch, lines in summaries.items()]
+        self._summary_pool = []
+        self._summary_spans = {}
+        self._summary_dead = 0
+        self._section_revs["chapter_summaries"] += 1
+        for ch, lines in items:
+            self.add_chapter_summary(ch, lines)
+    
+    def _build_static_context(self) -> Dict[str, Any]:
+        """构造与章节号无关的上下文部分（人物、剧情线索、世界观）"""
+        characters = {}
         # 获取主要人物（主角和重要配角）
-        for name, char in self.characters.items():
-            if char.role in ["主角", "重要配角"] or char.current_state:
-                context["characters"][name] = char.to_prompt_text()
+        for name in self._active_characters:
+            characters[name] = self.characters[name].to_prompt_text()
         
+        plot_threads = {}
         # 获取活跃的剧情线索
         for name, thread in self.plot_threads.items():
             if thread.status != "已解决":
-                context["plot_threads"][name] = thread.to_prompt_text()
+                plot_threads[name] = thread.to_prompt_text()
         
         # 获取重要的世界观细节
-        important_details = sorted(self.world_details, key=lambda x: x.importance, reverse=True)[:5]
-        context["world_details"] = [d.to_prompt_text() for d in important_details]
+        important_details = heapq.nlargest(5, self.world_details, key=attrgetter("importance"))
+        return {
+            "characters": characters,
+            "plot_threads": plot_threads,
+            "world_details": [d.to_prompt_text() for d in important_details],
+        }
+    
+    def get_context_for_chapter(self, chapter: int, window_size: int = 3) -> Dict[str, Any]:
+        """获取指定章节的上下文信息"""
+        # 状态未经 StoryManager 方法修改时复用缓存；返回浅拷贝，调用方修改不影响缓存
+        if self._ctx_cache is None or self._ctx_cache[0] != self._state_version:
+            self._ctx_cache = (self._state_version, self._build_static_context())
+        base = self._ctx_cache[1]
+        context = {
+            "characters": dict(base["characters"]),
+            "plot_threads": dict(base["plot_threads"]),
+            "world_details": list(base["world_details"]),
+            "recent_summaries": []
+        }
         
         # 获取最近几章的概要（滑动窗口）
         start_chapter = max(1, chapter - window_size)
+        append = context["recent_summaries"].append
+        pool = self._summary_pool
+        spans = self._summary_spans
         for ch in range(start_chapter, chapter):
-            if ch in self.chapter_summaries:
-                context["recent_summaries"].extend([
-                    f"第{ch}章：{line}" for line in self.chapter_summaries[ch][-5:]  # 每章保留5条关键
-                ])
+            span = spans.get(ch)
+            if span is None:
+                continue
+            a, b = span
+            prefix = f"第{ch}章："
+            for line in pool[max(a, b - 5):b]:  # 每章保留5条关键
+                append(prefix + line)
         
         return context
     
     def save_state(self, chapter: int):
         """保存当前状态到文件"""
-        state_file = self.save_dir / f"story_state_ch{chapter:02d}.json"
-        state = {
-            "chapter": chapter,
-            "characters": {
-                name: {
-                    "name": char.name,
-                    "role": char.role,
-                    "personality": char.personality,
-                    "abilities": char.abilities,
-                    "relationships": char.relationships,
-                    "arc": char.arc,
-                    "current_state": char.current_state,
-                    "key_items": char.key_items
-                }
-                for name, char in self.characters.items()
-            },
-            "plot_threads": {
-                name: {
-                    "name": thread.name,
-                    "description": thread.description,
-                    "status": thread.status,
-                    "key_events": thread.key_events,
-                    "related_characters": thread.related_characters
-                }
-                for name, thread in self.plot_threads.items()
-            },
-            "world_details": [
-                {
-                    "category": d.category,
-                    "name": d.name,
-                    "description": d.description,
-                    "importance": d.importance
-                }
-                for d in self.world_details
-            ],
-            "chapter_summaries": self.chapter_summaries
-        }
+        state_file = self._save_template.format(chapter)
         
-        with open(state_file, 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # 逐个顶层字段序列化并写入，峰值内存只与最大的一段相当
+            with open(state_file, 'wb') as f:
+                f.write(b'{\n  "chapter": ' + str(chapter).encode())
+                for key in _STATE_SECTIONS:
+                    f.write(b',\n  ' + orjson.dumps(key) + b": ")
+                    f.write(self._section_json(key))
+                f.write(b"\n}")
+        else:
+            state = {"chapter": chapter}
+            for key in _STATE_SECTIONS:
+                state[key] = self._section_value(key)
+            # json.dump 内部基于 iterencode 分块写出
+            with open(state_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2, default=_dataclass_to_dict)
+    
+    def _section_value(self, key: str) -> Any:
+        if key == "chapter_summaries":
+            return self._summaries_dict()
+        return getattr(self, key)
+    
+    def _section_json(self, key: str) -> bytes:
+        """序列化存档的一个顶层段；该段自上次保存后未修改时直接复用上次的结果"""
+        rev = self._section_revs[key]
+        cached = self._section_bytes.get(key)
+        if cached is not None and cached[0] == rev:
+            return cached[1]
+        # JSON 字符串内的换行已转义，直接替换即可整体缩进一级
+        data = orjson.dumps(self._section_value(key), option=_ORJSON_OPTION).replace(b"\n", b"\n  ")
+        self._section_bytes[key] = (rev, data)
+        return data
     
     def load_state(self, chapter: int) -> bool:
         """从文件加载状态"""
-        state_file = self.save_dir / f"story_state_ch{chapter:02d}.json"
-        if not state_file.exists():
+        state_file = self._save_template.format(chapter)
+        if not os.path.exists(state_file):
             return False
         
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
+        if orjson is not None:
+            with open(state_file, 'rb') as f:
+                state = orjson.loads(f.read())
+        else:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
         
         # 恢复人物
         self.characters = {}
         for name, char_data in state.get("characters", {}).items():
             self.characters[name] = Character(**char_data)
+        self._active_characters = {}
+        for name in self.characters:
+            self._refresh_active(name)
         
         # 恢复剧情线索
         self.plot_threads = {}
@@ -255,6 +526,9 @@ class StoryManager:
         self.chapter_summaries = {
             int(k): v for k, v in state.get("chapter_summaries", {}).items()
         }
+        self._state_version += 1
+        for section in self._section_revs:
+            self._section_revs[section] += 1
         
         return True
     
@@ -270,18 +544,30 @@ class StoryManager:
         # 这里可以后续接入NLP或LLM来智能提取
         # 目前使用简单的规则匹配
         
-        lines = chapter_text.split('\n')
-        for line in lines:
-            # 检测可能的人名（简单示例）
-            if "结识" in line or "遇见" in line or "认识" in line:
-                updates["new_characters"].append(line[:50])
-            
-            # 检测地点
-            if "来到" in line or "抵达" in line or "前往" in line:
-                updates["new_locations"].append(line[:50])
-            
-            # 检测物品
-            if "得到" in line or "获得" in line or "发现" in line:
-                updates["new_items"].append(line[:50])
+        if _KW_AUTOMATON is not None:
+            # 单遍多模式匹配，再按行起始偏移定位命中所在行；同一行同一类别只记一次
+            lines = chapter_text.split('\n')
+            line_starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+            last_line = {category: -1 for category in _UPDATE_KEYWORDS}
+            for end_idx, (category, _) in _KW_AUTOMATON.iter(chapter_text):
+                line_no = bisect_right(line_starts, end_idx) - 1
+                if line_no != last_line[category]:
+                    last_line[category] = line_no
+                    updates[category].append(lines[line_no][:50])
+            return updates
+        
+        # 每个类别一条预编译正则，在全文上 finditer，再回找所在行
+        for category, pattern in _KW_PATTERNS.items():
+            found = updates[category]
+            next_line_start = -1
+            for m in pattern.finditer(chapter_text):
+                if m.start() < next_line_start:
+                    continue  # 同一行已记录
+                line_start = chapter_text.rfind('\n', 0, m.start()) + 1
+                line_end = chapter_text.find('\n', m.end())
+                if line_end == -1:
+                    line_end = len(chapter_text)
+                found.append(chapter_text[line_start:min(line_end, line_start + 50)])
+                next_line_start = line_end + 1
         
         return updates
\ No newline at end of file
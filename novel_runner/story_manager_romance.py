@@ -1,13 +1,67 @@
 """
 追妻流小说故事管理器
 """
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from collections import deque
+from itertools import islice
 from pathlib import Path
 import json
+import os
+import pickle
+import sys
+import warnings
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # 可选依赖 orjson，缺失时使用标准库 json
+    orjson = None
 
-@dataclass
+try:
+    import msgpack  # type: ignore
+except ImportError:  # 可选依赖 msgpack，仅 state_format="msgpack" 时需要
+    msgpack = None
+
+
+# 快照格式 -> 文件后缀
+_STATE_SUFFIXES = {"json": ".json", "msgpack": ".mpk", "pickle": ".pkl"}
+
+
+@lru_cache(maxsize=None)
+def _public_fields(cls) -> Tuple[str, ...]:
+    """dataclass 的存档字段名（按定义顺序，跳过下划线开头的缓存字段）"""
+    return tuple(f.name for f in fields(cls) if not f.name.startswith("_"))
+
+
+def _render_relationships(relationships: Dict[str, str]) -> str:
+    return '；'.join([f"与{k}{v}" for k, v in relationships.items()])
+
+
+# 进入章节上下文的人物角色
+_MAIN_ROLES = frozenset(map(sys.intern, ("男主", "女主", "男配", "女配")))
+
+
+# get_context_for_chapter 可构造的上下文部分
+_CONTEXT_SECTIONS = frozenset(("characters", "emotion_threads", "recent_summaries"))
+
+
+# 情感线保留的最近关键事件数（提示词只展示最后 3 条）
+_KEY_EVENTS_KEEP = 32
+
+
+# 人物提示词布局：(字段, 行前缀, 渲染函数)，字段为空时跳过该行
+_CHARACTER_PROMPT_LAYOUT = (
+    ("personality", "  性格：", '、'.join),
+    ("background", "  背景：", str),
+    ("relationships", "  关系：", _render_relationships),
+    ("emotional_state", "  情感状态：", str),
+    ("secrets", "  秘密：", '、'.join),
+    ("growth", "  成长：", str),
+)
+
+
+@dataclass(slots=True)
 class RomanceCharacter:
     """追妻流人物档案"""
     name: str
@@ -20,240 +74,413 @@ class RomanceCharacter:
     emotional_state: str = ""  # 当前情感状态
     secrets: List[str] = field(default_factory=list)  # 隐藏的秘密
     growth: str = ""  # 成长变化
+    # 提示词文本缓存，字段经 RomanceStoryManager 更新时置脏
+    _cached_prompt: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    # 存档用字典缓存，与提示词缓存一同失效
+    _state_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # 角色名等短字符串在各人物/各存档间大量重复，统一驻留
+        self.name = sys.intern(self.name)
+        self.role = sys.intern(self.role)
+    
+    def to_state_dict(self) -> Dict[str, Any]:
+        """存档用字典（列表/字典字段与对象共享，不做深拷贝）"""
+        if self._state_cache is None:
+            self._state_cache = {name: getattr(self, name) for name in _public_fields(type(self))}
+        return self._state_cache
     
     def to_prompt_text(self) -> str:
         """转换为提示词文本"""
+        if not self._dirty:
+            return self._cached_prompt
         lines = [f"{self.name}（{self.role}，{self.age}岁，{self.occupation}）："]
-        if self.personality:
-            lines.append(f"  性格：{'、'.join(self.personality)}")
-        if self.background:
-            lines.append(f"  背景：{self.background}")
-        if self.relationships:
-            rel_text = '；'.join([f"与{k}{v}" for k, v in self.relationships.items()])
-            lines.append(f"  关系：{rel_text}")
-        if self.emotional_state:
-            lines.append(f"  情感状态：{self.emotional_state}")
-        if self.secrets:
-            lines.append(f"  秘密：{'、'.join(self.secrets)}")
-        if self.growth:
-            lines.append(f"  成长：{self.growth}")
-        return '\n'.join(lines)
+        lines.extend([
+            prefix + render(value)
+            for attr, prefix, render in _CHARACTER_PROMPT_LAYOUT
+            if (value := getattr(self, attr))
+        ])
+        self._cached_prompt = '\n'.join(lines)
+        self._dirty = False
+        return self._cached_prompt
 
 
-@dataclass
+@dataclass(slots=True)
 class EmotionThread:
     """情感线索"""
     name: str
     stage: str  # 当前阶段
     description: str
-    key_events: List[str] = field(default_factory=list)
+    key_events: deque = field(default_factory=lambda: deque(maxlen=_KEY_EVENTS_KEEP))
     tension_level: int = 5  # 1-10 紧张程度
+    _cached_prompt: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    _state_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # 构造或从存档恢复时传入的是列表，统一转为有界 deque
+        if not isinstance(self.key_events, deque):
+            self.key_events = deque(self.key_events, maxlen=_KEY_EVENTS_KEEP)
+    
+    def to_state_dict(self) -> Dict[str, Any]:
+        """存档用字典"""
+        if self._state_cache is None:
+            state = {name: getattr(self, name) for name in _public_fields(type(self))}
+            state["key_events"] = list(self.key_events)
+            self._state_cache = state
+        return self._state_cache
     
     def to_prompt_text(self) -> str:
+        if not self._dirty:
+            return self._cached_prompt
         lines = [f"【{self.name}】{self.stage}（强度:{self.tension_level}/10）"]
         lines.append(f"  {self.description}")
         if self.key_events:
-            recent = self.key_events[-3:] if len(self.key_events) > 3 else self.key_events
+            recent = islice(self.key_events, max(len(self.key_events) - 3, 0), None)
             lines.append(f"  关键事件：{'→'.join(recent)}")
-        return '\n'.join(lines)
+        self._cached_prompt = '\n'.join(lines)
+        self._dirty = False
+        return self._cached_prompt
+
+
+# 追妻流默认人物与情感线（列表字段以元组存放，构造时复制为新列表/字典）
+_DEFAULT_CHARACTERS = (
+    # 男主设定
+    ("男主", {
+        "name": "陆景深",
+        "role": "男主",
+        "age": 32,
+        "occupation": "跨国集团总裁",
+        "personality": ("冷漠", "霸道", "占有欲强", "后期深情"),
+        "background": "豪门继承人，年少成名，商界传奇",
+        "emotional_state": "初期：自负傲慢；后期：悔恨追妻",
+        "secrets": ("其实一直深爱女主", "被人设计陷害"),
+    }),
+    # 女主设定
+    ("女主", {
+        "name": "苏念",
+        "role": "女主",
+        "age": 28,
+        "occupation": "独立设计师",
+        "personality": ("坚强", "善良", "倔强", "重感情"),
+        "background": "普通家庭，靠自己打拼，曾为爱付出一切",
+        "emotional_state": "初期：心死绝望；后期：慢慢心软",
+        "secrets": ("怀有身孕", "患有疾病", "另有身世"),
+    }),
+    # 男配设定
+    ("男配", {
+        "name": "顾北辰",
+        "role": "男配",
+        "age": 30,
+        "occupation": "医生/律师",
+        "personality": ("温柔", "体贴", "默默守护"),
+        "background": "女主的朋友，一直暗恋女主",
+        "relationships": {"苏念": "暗恋守护"},
+        "emotional_state": "愿意等待，但会适时退出",
+    }),
+    # 女配设定（白月光）
+    ("女配", {
+        "name": "沈雨薇",
+        "role": "女配",
+        "age": 29,
+        "occupation": "明星/千金",
+        "personality": ("心机", "表面柔弱", "善于伪装"),
+        "background": "男主的初恋/青梅竹马",
+        "relationships": {"陆景深": "前女友/白月光"},
+        "emotional_state": "想要夺回男主",
+    }),
+)
+
+_DEFAULT_EMOTION_THREADS = (
+    # 主要情感线
+    ("主线", {
+        "name": "男女主情感",
+        "stage": "破裂期",
+        "description": "从深爱到误会，从分离到追回",
+        "key_events": ("相爱结婚", "误会产生", "痛苦分离"),
+        "tension_level": 8,
+    }),
+    # 辅助情感线
+    ("男配线", {
+        "name": "男配守护",
+        "stage": "陪伴期",
+        "description": "男配默默守护女主，成为对比",
+        "tension_level": 4,
+    }),
+    ("反派线", {
+        "name": "白月光搅局",
+        "stage": "挑拨期",
+        "description": "女配不断制造误会和麻烦",
+        "tension_level": 6,
+    }),
+)
+
+
+def _fresh_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """复制默认数据中的可变字段，避免多个管理器实例共享同一列表/字典"""
+    fresh = {}
+    for key, value in kwargs.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        elif isinstance(value, dict):
+            value = dict(value)
+        fresh[key] = value
+    return fresh
 
 
 class RomanceStoryManager:
     """追妻流故事管理器"""
     
-    def __init__(self, save_dir: Path):
+    def __init__(self, save_dir: Path, init_defaults: bool = True, state_format: str = "json"):
+        if state_format not in _STATE_SUFFIXES:
+            raise ValueError(f"不支持的存档格式: {state_format}")
+        if state_format == "msgpack" and msgpack is None:
+            raise ImportError("state_format='msgpack' 需要安装 msgpack")
         self.save_dir = save_dir
         self.save_dir.mkdir(parents=True, exist_ok=True)
+        # 章节快照格式：json（默认，可读）/ msgpack / pickle（二进制，更快更小）
+        self.state_format = state_format
         
+        # 人物/情感线只能经 update_character_emotion、add_emotion_event、update_emotion_stage 修改：
+        # 提示词、存档字典与上下文缓存只在这些方法中失效，直接给字段赋值或原地修改（不支持）会读到旧的结果
         self.characters: Dict[str, RomanceCharacter] = {}
         self.emotion_threads: Dict[str, EmotionThread] = {}
         self.chapter_summaries: Dict[int, List[str]] = {}
         self.emotion_arc: List[str] = []  # 情感曲线记录
         
+        # 章节概要与情感曲线只增不改，按章追加到日志文件；此处记录尚未写入日志的 (章节号, 曲线条目)
+        self._log_file = self.save_dir / "romance_log.jsonl"
+        self._pending_log: List[Tuple[int, str]] = []
+        
+        # 状态修改版本号；上下文按 (章节号, 版本号) 缓存最近一次结果
+        self._state_version: int = 0
+        self._ctx_cache: Optional[Tuple[Tuple[int, int, frozenset], Dict[str, Any]]] = None
+        
         # 初始化基础设定
-        self._init_base_settings()
+        if init_defaults:
+            self._init_base_settings()
     
     def _init_base_settings(self):
-        """初始化追妻流基础设定"""
-        
-        # 男主设定
-        self.characters["男主"] = RomanceCharacter(
-            name="陆景深",
-            role="男主",
-            age=32,
-            occupation="跨国集团总裁",
-            personality=["冷漠", "霸道", "占有欲强", "后期深情"],
-            background="豪门继承人，年少成名，商界传奇",
-            emotional_state="初期：自负傲慢；后期：悔恨追妻",
-            secrets=["其实一直深爱女主", "被人设计陷害"]
-        )
-        
-        # 女主设定
-        self.characters["女主"] = RomanceCharacter(
-            name="苏念",
-            role="女主",
-            age=28,
-            occupation="独立设计师",
-            personality=["坚强", "善良", "倔强", "重感情"],
-            background="普通家庭，靠自己打拼，曾为爱付出一切",
-            emotional_state="初期：心死绝望；后期：慢慢心软",
-            secrets=["怀有身孕", "患有疾病", "另有身世"]
-        )
-        
-        # 男配设定
-        self.characters["男配"] = RomanceCharacter(
-            name="顾北辰",
-            role="男配",
-            age=30,
-            occupation="医生/律师",
-            personality=["温柔", "体贴", "默默守护"],
-            background="女主的朋友，一直暗恋女主",
-            relationships={"苏念": "暗恋守护"},
-            emotional_state="愿意等待，但会适时退出"
-        )
-        
-        # 女配设定（白月光）
-        self.characters["女配"] = RomanceCharacter(
-            name="沈雨薇",
-            role="女配",
-            age=29,
-            occupation="明星/千金",
-            personality=["心机", "表面柔弱", "善于伪装"],
-            background="男主的初恋/青梅竹马",
-            relationships={"陆景深": "前女友/白月光"},
-            emotional_state="想要夺回男主"
-        )
-        
-        # 主要情感线
-        self.emotion_threads["主线"] = EmotionThread(
-            name="男女主情感",
-            stage="破裂期",
-            description="从深爱到误会，从分离到追回",
-            key_events=["相爱结婚", "误会产生", "痛苦分离"],
-            tension_level=8
-        )
-        
-        # 辅助情感线
-        self.emotion_threads["男配线"] = EmotionThread(
-            name="男配守护",
-            stage="陪伴期",
-            description="男配默默守护女主，成为对比",
-            tension_level=4
-        )
-        
-        self.emotion_threads["反派线"] = EmotionThread(
-            name="白月光搅局",
-            stage="挑拨期",
-            description="女配不断制造误会和麻烦",
-            tension_level=6
-        )
+        """初始化追妻流基础设定（从模块级默认数据构造，可变字段逐个复制）"""
+        for key, kwargs in _DEFAULT_CHARACTERS:
+            self.characters[key] = RomanceCharacter(**_fresh_kwargs(kwargs))
+        for key, kwargs in _DEFAULT_EMOTION_THREADS:
+            self.emotion_threads[key] = EmotionThread(**_fresh_kwargs(kwargs))
     
     def update_character_emotion(self, name: str, new_state: str, growth: str = None):
         """更新人物情感状态"""
         if name in self.characters:
-            self.characters[name].emotional_state = new_state
+            char = self.characters[name]
+            char.emotional_state = new_state
             if growth:
-                self.characters[name].growth = growth
+                char.growth = growth
+            char._dirty = True
+            char._state_cache = None
+            self._state_version += 1
     
     def add_emotion_event(self, thread_name: str, event: str, new_tension: int = None):
         """添加情感事件"""
         if thread_name in self.emotion_threads:
-            self.emotion_threads[thread_name].key_events.append(event)
+            thread = self.emotion_threads[thread_name]
+            thread.key_events.append(event)
             if new_tension:
-                self.emotion_threads[thread_name].tension_level = new_tension
+                thread.tension_level = new_tension
+            thread._dirty = True
+            thread._state_cache = None
+            self._state_version += 1
     
     def update_emotion_stage(self, thread_name: str, new_stage: str, description: str = None):
         """更新情感阶段"""
         if thread_name in self.emotion_threads:
-            self.emotion_threads[thread_name].stage = new_stage
+            thread = self.emotion_threads[thread_name]
+            thread.stage = new_stage
             if description:
-                self.emotion_threads[thread_name].description = description
+                thread.description = description
+            thread._dirty = True
+            thread._state_cache = None
+            self._state_version += 1
     
-    def get_context_for_chapter(self, chapter: int) -> Dict[str, Any]:
-        """获取章节上下文"""
-        context = {
-            "characters": {},
-            "emotion_threads": {},
-            "recent_summaries": []
-        }
+    def get_context_for_chapter(
+        self, chapter: int, *, include: frozenset = _CONTEXT_SECTIONS
+    ) -> Dict[str, Any]:
+        """获取章节上下文；include 指定需要的部分，未列出的部分不构造也不出现在结果中"""
+        # 同一章节、同一组部分且状态未经管理器方法修改时复用缓存；返回浅拷贝，调用方修改不影响缓存
+        key = (chapter, self._state_version, include)
+        if self._ctx_cache is None or self._ctx_cache[0] != key:
+            self._ctx_cache = (key, self._build_context(chapter, include))
+        return {name: section.copy() for name, section in self._ctx_cache[1].items()}
+    
+    def _build_context(self, chapter: int, include: frozenset) -> Dict[str, Any]:
+        """构造章节上下文"""
+        context: Dict[str, Any] = {}
         
         # 获取主要人物状态
-        for name, char in self.characters.items():
-            if char.role in ["男主", "女主", "男配", "女配"]:
-                context["characters"][name] = char.to_prompt_text()
+        if "characters" in include:
+            context["characters"] = {
+                name: char.to_prompt_text()
+                for name, char in self.characters.items()
+                if char.role in _MAIN_ROLES
+            }
         
         # 获取情感线索
-        for name, thread in self.emotion_threads.items():
-            context["emotion_threads"][name] = thread.to_prompt_text()
+        if "emotion_threads" in include:
+            context["emotion_threads"] = {
+                name: thread.to_prompt_text() for name, thread in self.emotion_threads.items()
+            }
         
         # 获取最近章节概要
-        window_size = 3
-        start_chapter = max(1, chapter - window_size)
-        for ch in range(start_chapter, chapter):
-            if ch in self.chapter_summaries:
-                for line in self.chapter_summaries[ch][-5:]:
-                    context["recent_summaries"].append(f"第{ch}章：{line}")
+        if "recent_summaries" in include:
+            recent: List[str] = []
+            window_size = 3
+            start_chapter = max(1, chapter - window_size)
+            for ch in range(start_chapter, chapter):
+                if ch in self.chapter_summaries:
+                    prefix = f"第{ch}章："
+                    for line in self.chapter_summaries[ch][-5:]:
+                        recent.append(prefix + line)
+            context["recent_summaries"] = recent
         
         return context
     
     def add_chapter_summary(self, chapter: int, summary_lines: List[str]):
         """添加章节概要"""
         self.chapter_summaries[chapter] = summary_lines
+        self._state_version += 1
         
-        # 记录情感曲线
-        if "心碎" in str(summary_lines):
-            self.emotion_arc.append(f"第{chapter}章：虐心")
-        elif "甜蜜" in str(summary_lines) or "和好" in str(summary_lines):
-            self.emotion_arc.append(f"第{chapter}章：甜蜜")
+        # 记录情感曲线（概要只拼接一次；"心碎"优先于"甜蜜/和好"）
+        text = "\n".join(summary_lines)
+        if "心碎" in text:
+            tag = "虐心"
+        elif "甜蜜" in text or "和好" in text:
+            tag = "甜蜜"
         else:
-            self.emotion_arc.append(f"第{chapter}章：过渡")
+            tag = "过渡"
+        arc_entry = f"第{chapter}章：{tag}"
+        self.emotion_arc.append(arc_entry)
+        self._pending_log.append((chapter, arc_entry))
     
-    def save_state(self, chapter: int):
-        """保存状态"""
-        state_file = self.save_dir / f"romance_state_ch{chapter:02d}.json"
+    def save_state(self, chapter: int, pretty: bool = False):
+        """保存状态：人物与情感线写入本章快照，新增章节概要追加到日志
+
+        快照按 state_format 写出；JSON 默认紧凑输出，pretty=True 时缩进两格便于人工查看。
+        """
+        state_file = self._state_file(chapter, self.state_format)
         state = {
             "chapter": chapter,
+            # 未修改的人物/情感线直接复用缓存的存档字典
             "characters": {
-                name: {
-                    "name": char.name,
-                    "role": char.role,
-                    "age": char.age,
-                    "occupation": char.occupation,
-                    "personality": char.personality,
-                    "background": char.background,
-                    "relationships": char.relationships,
-                    "emotional_state": char.emotional_state,
-                    "secrets": char.secrets,
-                    "growth": char.growth
-                }
-                for name, char in self.characters.items()
+                name: char.to_state_dict() for name, char in self.characters.items()
             },
             "emotion_threads": {
-                name: {
-                    "name": thread.name,
-                    "stage": thread.stage,
-                    "description": thread.description,
-                    "key_events": thread.key_events,
-                    "tension_level": thread.tension_level
-                }
-                for name, thread in self.emotion_threads.items()
+                name: thread.to_state_dict() for name, thread in self.emotion_threads.items()
             },
-            "chapter_summaries": self.chapter_summaries,
-            "emotion_arc": self.emotion_arc
+            # 本快照依赖日志中的这些章节；加载时据此校验日志是否完整
+            "logged_chapters": sorted(ch for ch in self.chapter_summaries if ch <= chapter),
         }
         
-        with open(state_file, 'w', encoding='utf-8') as f:
-            json.dump(state, f, ensure_ascii=False, indent=2)
+        # 只写入上次保存后新增的章节，避免每章重写全部历史概要。
+        # 日志先落盘再替换快照：快照一旦可见，它引用的概要必定已持久化
+        if self._pending_log:
+            with open(self._log_file, 'a', encoding='utf-8') as f:
+                for ch, arc_entry in self._pending_log:
+                    entry = {
+                        "chapter": ch,
+                        "summary": self.chapter_summaries.get(ch, []),
+                        "arc": arc_entry,
+                    }
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending_log = []
+        
+        # 先序列化为字节，再写临时文件并原子替换，避免中途崩溃留下残缺快照
+        if self.state_format == "msgpack":
+            data = msgpack.packb(state, use_bin_type=True)
+        elif self.state_format == "pickle":
+            data = pickle.dumps(state, protocol=5)
+        elif orjson is not None:
+            data = orjson.dumps(state, option=orjson.OPT_INDENT_2 if pretty else 0)
+        elif pretty:
+            data = json.dumps(state, ensure_ascii=False, indent=2).encode('utf-8')
+        else:
+            data = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+        
+        tmp = state_file.with_name(state_file.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, state_file)
+    
+    def _state_file(self, chapter: int, state_format: str) -> Path:
+        return self.save_dir / f"romance_state_ch{chapter:02d}{_STATE_SUFFIXES[state_format]}"
+    
+    def _read_state(self, chapter: int) -> Optional[Dict[str, Any]]:
+        """读取章节快照：优先当前格式，其次回退到 JSON（兼容旧存档）"""
+        for state_format in dict.fromkeys((self.state_format, "json")):
+            state_file = self._state_file(chapter, state_format)
+            if not state_file.exists():
+                continue
+            with open(state_file, 'rb') as f:
+                data = f.read()
+            if state_format == "msgpack":
+                if msgpack is None:
+                    continue
+                return msgpack.unpackb(data, raw=False)
+            if state_format == "pickle":
+                return pickle.loads(data)
+            return orjson.loads(data) if orjson is not None else json.loads(data)
+        return None
+    
+    def _replay_log(self, chapter: int, expected: Optional[List[int]] = None) -> None:
+        """从日志恢复第 chapter 章及之前的概要与情感曲线（同一章以最后一次记录为准）
+
+        expected 为快照记录的依赖章节；日志缺失、有损坏行或缺少这些章节时发出 RuntimeWarning。
+        """
+        entries: Dict[int, Dict[str, Any]] = {}
+        bad_lines = 0
+        if self._log_file.exists():
+            with open(self._log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        ch = entry["chapter"]
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        bad_lines += 1  # 写入中断留下的残行
+                        continue
+                    if ch <= chapter:
+                        entries[ch] = entry
+        elif expected:
+            warnings.warn(
+                f"概要日志不存在: {self._log_file}，第{chapter}章快照的概要与情感曲线无法恢复",
+                RuntimeWarning,
+                stacklevel=3,
+            )
+        if bad_lines:
+            warnings.warn(
+                f"概要日志 {self._log_file} 中有 {bad_lines} 行无法解析，已跳过",
+                RuntimeWarning,
+                stacklevel=3,
+            )
+        if expected and self._log_file.exists():
+            missing = [ch for ch in expected if ch not in entries]
+            if missing:
+                warnings.warn(
+                    f"概要日志缺少第{chapter}章快照依赖的章节: {missing}",
+                    RuntimeWarning,
+                    stacklevel=3,
+                )
+        chapters = sorted(entries)
+        self.chapter_summaries = {ch: entries[ch]["summary"] for ch in chapters}
+        self.emotion_arc = [entries[ch]["arc"] for ch in chapters]
     
     def load_state(self, chapter: int) -> bool:
         """加载状态"""
-        state_file = self.save_dir / f"romance_state_ch{chapter:02d}.json"
-        if not state_file.exists():
+        state = self._read_state(chapter)
+        if state is None:
             return False
         
-        with open(state_file, 'r', encoding='utf-8') as f:
-            state = json.load(f)
-        
         # 恢复人物
         self.characters = {}
         for name, char_data in state.get("characters", {}).items():
@@ -264,9 +491,15 @@ class RomanceStoryManager:
         for name, thread_data in state.get("emotion_threads", {}).items():
             self.emotion_threads[name] = EmotionThread(**thread_data)
         
-        self.chapter_summaries = {
-            int(k): v for k, v in state.get("chapter_summaries", {}).items()
-        }
-        self.emotion_arc = state.get("emotion_arc", [])
+        if "chapter_summaries" in state:
+            # 旧版快照内含全部概要
+            self.chapter_summaries = {
+                int(k): v for k, v in state["chapter_summaries"].items()
+            }
+            self.emotion_arc = state.get("emotion_arc", [])
+        else:
+            self._replay_log(chapter, state.get("logged_chapters"))
+        self._pending_log = []
+        self._state_version += 1
         
         return True
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Tuple
 from .templates_base import style_rules_common_user, style_rules_common_system
 
 
@@ -19,10 +20,46 @@ WORLD_SETTING = (
 )
 
 
+# 与章节无关的固定提示块，导入时一次性构造
+_STYLE_BLOCK = (
+    "风格要求: 想象力奔涌, 心怀高远理想与不凡愿望; 语言可宏阔但不空喊口号, "
+    "以细节与行动承载理想; 不低俗, 不血腥, 不狂躁; 叙事以因果推进, 人物以选择承担代价。\n"
+    + style_rules_common_user
+)
+
+_STRUCTURE_BLOCK = (
+    "结构为起承转合四段, 每段约八百至九百字; 结尾留下温火而有力的悬念; "
+    "只输出纯小说正文, 不写任何标题、编号、分隔符或元信息; "
+    "不要在文末写下一章预告或写作意图。"
+)
+
+_WORD_COUNT_BLOCK = "字数为三千四百至三千六百字。"
+
+# user 提示末尾的固定要求（风格、结构、字数）预先拼好
+_PROMPT_TAIL = f"{_STYLE_BLOCK}\n{_STRUCTURE_BLOCK}\n{_WORD_COUNT_BLOCK}"
+
+_SYSTEM_CONTENT = (
+    "你是一位擅长中国古代玄幻长篇创作的作家, "
+    "将平台价值观内化为写作底线, 保证内容有思想厚度与人性温度。"
+    "重要：只输出小说正文内容，不要输出任何其他信息。\n"
+    + style_rules_common_system + "\n"
+    + PLATFORM_VALUES
+)
+
+# system 消息各次调用共用（调用方只读不改）
+_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_CONTENT}
+
+
 def _join_summary_lines(summary_lines: List[str]) -> str:
     if not summary_lines:
         return "前情提要为空, 因为是开篇。"
-    cleaned = [line.strip() for line in summary_lines if line.strip()]
+    # 重试或重复构建同一章时输入内容相同，按内容元组缓存
+    return _join_summary_tuple(tuple(summary_lines))
+
+
+@lru_cache(maxsize=8)
+def _join_summary_tuple(summary_lines: Tuple[str, ...]) -> str:
+    cleaned = [s for line in summary_lines if (s := line.strip())]
     bullet = "\n".join(f"- {s}" for s in cleaned)
     return f"前情提要如下, 仅含关键因果与心性变化:\n{bullet}"
 
@@ -73,12 +110,6 @@ def build_chapter_messages(
             recent = "\n".join(f"- {s}" for s in story_context["recent_summaries"])
             enhanced_summary_block = f"【近期剧情脉络】\n{recent}\n\n【上章详细】\n{summary_block}"
 
-    style_block = (
-        "风格要求: 想象力奔涌, 心怀高远理想与不凡愿望; 语言可宏阔但不空喊口号, "
-        "以细节与行动承载理想; 不低俗, 不血腥, 不狂躁; 叙事以因果推进, 人物以选择承担代价。\n"
-        + style_rules_common_user
-    )
-
     chapter_goal_map = {
         1: "写出穿越的契机与清晰代价, 确立世界规则与初始冲突, 主角作出一次承担代价的选择。",
         2: "初涉江湖与结义同道, 小胜引出更大难题, 得入门法器与关键线索。",
@@ -95,14 +126,6 @@ def build_chapter_messages(
         "推进主线与人物成长, 留下温火悬念并种下下一章目标。",
     )
 
-    structure_block = (
-        "结构为起承转合四段, 每段约八百至九百字; 结尾留下温火而有力的悬念; "
-        "只输出纯小说正文, 不写任何标题、编号、分隔符或元信息; "
-        "不要在文末写下一章预告或写作意图。"
-    )
-
-    word_count_block = "字数为三千四百至三千六百字。"
-
     user_prompt = (
         f"请写第{chapter_index}章正文。\n"
         f"{enhanced_summary_block}"
@@ -111,25 +134,20 @@ def build_chapter_messages(
         f"{world_detail_block}\n"
         f"世界观: {WORLD_SETTING}\n"
         f"本章目标: {chapter_goal}\n"
-        f"{style_block}\n{structure_block}\n{word_count_block}"
+        f"{_PROMPT_TAIL}"
     )
 
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "你是一位擅长中国古代玄幻长篇创作的作家, "+
-                "将平台价值观内化为写作底线, 保证内容有思想厚度与人性温度。"+
-                "重要：只输出小说正文内容，不要输出任何其他信息。\n"+
-                style_rules_common_system + "\n"+
-                PLATFORM_VALUES
-            ),
-        },
+        _SYSTEM_MSG,
         {"role": "user", "content": user_prompt},
     ]
     return messages
 
 
+# 概要请求的 system 消息同样只读共用
+_SUMMARY_SYSTEM_MSG = {"role": "system", "content": "你是严谨的文学编辑, 擅长提炼剧情要点。"}
+
+
 def build_summary_messages(chapter_text: str) -> List[Dict[str, str]]:
     """
     Ask model to summarize the chapter into 8-12 concise Chinese bullet lines.
@@ -140,7 +158,7 @@ def build_summary_messages(chapter_text: str) -> List[Dict[str, str]]:
         "【正文】\n" + chapter_text
     )
     return [
-        {"role": "system", "content": "你是严谨的文学编辑, 擅长提炼剧情要点。"},
+        _SUMMARY_SYSTEM_MSG,
         {"role": "user", "content": prompt},
     ]
 
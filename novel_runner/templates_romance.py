@@ -1,7 +1,8 @@
 """
 追妻/后悔流虐文小说模板
 """
-from typing import List, Dict, Optional, Any
+from functools import lru_cache
+from typing import List, Dict, Optional, Any, Tuple
 from .templates_base import style_rules_common_user, style_rules_common_system
 
 
@@ -55,10 +56,105 @@ STORY_STRUCTURE = {
 }
 
 
+# 各阶段的最后一章与写作重点
+_ARC_GUIDES = (
+    (3, "arc1_虐心离别", "重点描写：误会的产生、信任的崩塌、离别的痛苦。要让读者心疼女主，对男主又爱又恨。"),
+    (6, "arc2_各自煎熬", "重点描写：分离后的空虚、对往事的回忆、内心的挣扎。展现两人都在受煎熬。"),
+    (9, "arc3_真相渐明", "重点描写：真相的冲击、男主的悔恨、想要挽回的急切。让读者期待他们重新在一起。"),
+    (12, "arc4_追妻之路", "重点描写：男主的真诚悔改、各种追求手段、女主的内心动摇。制造推拉感。"),
+    (None, "arc5_破镜重圆", "重点描写：最后的考验、真心的证明、重新在一起的感动。要甜要治愈。"),
+)
+
+
+def _build_arc_table() -> tuple:
+    """展开为按章节号索引的 (阶段名, 写作重点, 主题, 情绪) 表，末项对应之后所有章节"""
+    table = []
+    for last, arc, guide in _ARC_GUIDES:
+        current_arc = STORY_STRUCTURE.get(arc, {})
+        row = (arc, guide, current_arc.get("theme", ""), current_arc.get("emotion", ""))
+        if last is None:
+            table.append(row)
+        else:
+            table.extend([row] * (last + 1 - len(table)))
+    return tuple(table)
+
+
+_ARC_TABLE = _build_arc_table()
+
+
+_DEFAULT_CHAPTER_GOAL = "推进剧情，深化情感冲突，为下一章做铺垫。"
+
+# 章节具体目标，按章节号索引（第 0 章无专属目标，取默认值）
+_CHAPTER_GOALS = (
+    _DEFAULT_CHAPTER_GOAL,
+    "开篇即虐：展现曾经恩爱的片段，然后急转直下，男主因误会/白月光回归而伤害女主，女主心死决定离婚/分手。",
+    "决绝离去：女主坚决离开，男主还在自以为是，女主隐瞒重要秘密（如怀孕、病情等），制造强烈冲突。",
+    "各奔东西：正式分离，女主开始新生活，男主还沉浸在过去，但开始感到不对劲。",
+    "表面平静：女主努力重新开始，但夜深人静时的脆弱；男主开始频繁想起女主，但还在压抑。",
+    "意外相遇：两人因工作/社交意外重逢，表面冷漠，内心波澜，旁人看出端倪。",
+    "暗流涌动：通过他人视角展现两人的改变，男主开始调查当年的事，初见端倪。",
+    "真相一角：部分真相曝光，男主震惊，开始意识到自己的错误，急于见女主。",
+    "悔恨交加：男主知道全部真相，崩溃懊悔，开始疯狂寻找女主，女主刻意躲避。",
+    "初次追求：男主找到女主，真诚道歉，女主冷漠拒绝，但内心已有波动。",
+    "持续努力：男主用各种方式追求（送花、等待、保护等），女主表面不为所动。",
+    "心防松动：通过某个事件（如女主遇险），男主奋不顾身，女主心防开始松动。",
+    "进退两难：女主内心挣扎，想原谅但怕再次受伤，男主表现出改变和成长。",
+    "最后考验：出现新的危机/考验，考验男主的真心，男主证明自己。",
+    "冰释前嫌：女主终于原谅，两人坦诚相对，解开所有心结。",
+    "甜蜜结局：重新在一起，弥补过去的遗憾，展望美好未来，温馨收尾。",
+)
+
+
+# 与章节无关的固定提示块，导入时一次性构造
+_STYLE_BLOCK = (
+    "文风要求：情感细腻真实，对话贴近生活，心理描写深入，"
+    "场景描写生动，节奏张弛有度。要让读者有代入感，情绪跟着起伏。"
+    "多用细节展现情感，少用直白说教。虐要虐到心坎，甜要甜到发齁。\n"
+    + style_rules_common_user
+)
+
+_STRUCTURE_BLOCK = (
+    "结构为起承转合四段，每段约八百至九百字；"
+    "开头要有钩子吸引读者，结尾要有悬念或情感爆点；"
+    "只输出纯小说正文，不写任何标题、编号、分隔符或元信息。"
+)
+
+_WORD_COUNT_BLOCK = "字数为三千四百至三千六百字。"
+
+_TECHNIQUE_BLOCK = (
+    "写作技巧：\n"
+    "1. 多用动作和细节展现情感，如'手指微颤''眼眶泛红'等\n"
+    "2. 对话要符合人物性格和当前情绪状态\n"
+    "3. 适当使用倒叙、插叙增加张力\n"
+    "4. 内心独白展现人物真实想法\n"
+    "5. 环境描写烘托情绪氛围"
+)
+
+# 用户提示词末尾的固定部分
+_FIXED_TAIL_BLOCK = "\n".join((_STYLE_BLOCK, _TECHNIQUE_BLOCK, _STRUCTURE_BLOCK, _WORD_COUNT_BLOCK))
+
+_SYSTEM_CONTENT_ROMANCE = (
+    "你是一位擅长现代都市情感小说创作的作家，尤其精通虐恋、追妻流等题材。"
+    "你的作品情感真挚，虐点精准，能够深深打动读者的心。"
+    "你懂得如何营造情感张力，制造冲突和转折。\n"
+    + style_rules_common_system + "\n"
+    + PLATFORM_VALUES
+)
+
+# system 消息各次调用共用（调用方只读不改）
+_SYSTEM_MSG_ROMANCE = {"role": "system", "content": _SYSTEM_CONTENT_ROMANCE}
+
+
 def _join_summary_lines(summary_lines: List[str]) -> str:
     if not summary_lines:
         return "前情提要：故事开始。"
-    cleaned = [line.strip() for line in summary_lines if line.strip()]
+    # 重试或重复构建同一章时输入内容相同，按内容元组缓存
+    return _join_summary_tuple(tuple(summary_lines))
+
+
+@lru_cache(maxsize=8)
+def _join_summary_tuple(summary_lines: Tuple[str, ...]) -> str:
+    cleaned = [s for line in summary_lines if (s := line.strip())]
     bullet = "\n".join(f"- {s}" for s in cleaned)
     return f"前情提要：\n{bullet}"
 
@@ -70,7 +166,7 @@ def _join_recent_window(recent_summaries: List[str]) -> str:
     if not cleaned:
         return ""
     body = "\n".join(f"- {s}" for s in cleaned)
-    return f"\n【近期剧情脉络】(近3-5章)\n{body}\n"
+    return f"【近期剧情脉络】(近3-5章)\n{body}"
 
 
 def build_chapter_messages_romance(
@@ -84,157 +180,72 @@ def build_chapter_messages_romance(
     """
     构建追妻流小说章节的提示词
     """
-    summary_block = _join_summary_lines(summary_lines)
-    recent_block = ""
-    if story_context and "recent_summaries" in story_context:
-        recent_block = _join_recent_window(story_context.get("recent_summaries", []))
-    
-    # 构建人物档案块
-    character_block = ""
-    if story_context and "characters" in story_context:
-        char_lines = list(story_context["characters"].values())
+    # 各提示块依次收集后一次拼接，空块直接跳过
+    parts = [f"请写第{chapter_index}章正文。", _join_summary_lines(summary_lines)]
+    if story_context:
+        # 人物档案块
+        char_lines = list(story_context.get("characters", {}).values())
         if char_lines:
-            character_block = "\n【人物状态】\n" + "\n".join(char_lines)
-    
-    # 构建情感线索块
-    emotion_block = ""
-    if story_context and "emotion_threads" in story_context:
-        emotion_lines = list(story_context["emotion_threads"].values())
+            parts.append("【人物状态】\n" + "\n".join(char_lines))
+        # 情感线索块
+        emotion_lines = list(story_context.get("emotion_threads", {}).values())
         if emotion_lines:
-            emotion_block = "\n【情感进展】\n" + "\n".join(emotion_lines)
+            parts.append("【情感进展】\n" + "\n".join(emotion_lines))
+        recent_block = _join_recent_window(story_context.get("recent_summaries", []))
+        if recent_block:
+            parts.append(recent_block)
     
-    # 根据章节确定当前阶段
-    if chapter_index <= 3:
-        arc = "arc1_虐心离别"
-        emotion_guide = "重点描写：误会的产生、信任的崩塌、离别的痛苦。要让读者心疼女主，对男主又爱又恨。"
-    elif chapter_index <= 6:
-        arc = "arc2_各自煎熬"
-        emotion_guide = "重点描写：分离后的空虚、对往事的回忆、内心的挣扎。展现两人都在受煎熬。"
-    elif chapter_index <= 9:
-        arc = "arc3_真相渐明"
-        emotion_guide = "重点描写：真相的冲击、男主的悔恨、想要挽回的急切。让读者期待他们重新在一起。"
-    elif chapter_index <= 12:
-        arc = "arc4_追妻之路"
-        emotion_guide = "重点描写：男主的真诚悔改、各种追求手段、女主的内心动摇。制造推拉感。"
+    # 查表得到当前阶段与本章目标（0 及负数按第 1 阶段处理，超出范围取最后阶段）
+    _, emotion_guide, arc_theme, arc_emotion = _ARC_TABLE[
+        min(max(chapter_index, 0), len(_ARC_TABLE) - 1)
+    ]
+    if 0 <= chapter_index < len(_CHAPTER_GOALS):
+        chapter_goal = _CHAPTER_GOALS[chapter_index]
     else:
-        arc = "arc5_破镜重圆"
-        emotion_guide = "重点描写：最后的考验、真心的证明、重新在一起的感动。要甜要治愈。"
-    
-    current_arc = STORY_STRUCTURE.get(arc, {})
-    
-    # 章节具体目标
-    chapter_goals = {
-        1: "开篇即虐：展现曾经恩爱的片段，然后急转直下，男主因误会/白月光回归而伤害女主，女主心死决定离婚/分手。",
-        2: "决绝离去：女主坚决离开，男主还在自以为是，女主隐瞒重要秘密（如怀孕、病情等），制造强烈冲突。",
-        3: "各奔东西：正式分离，女主开始新生活，男主还沉浸在过去，但开始感到不对劲。",
-        4: "表面平静：女主努力重新开始，但夜深人静时的脆弱；男主开始频繁想起女主，但还在压抑。",
-        5: "意外相遇：两人因工作/社交意外重逢，表面冷漠，内心波澜，旁人看出端倪。",
-        6: "暗流涌动：通过他人视角展现两人的改变，男主开始调查当年的事，初见端倪。",
-        7: "真相一角：部分真相曝光，男主震惊，开始意识到自己的错误，急于见女主。",
-        8: "悔恨交加：男主知道全部真相，崩溃懊悔，开始疯狂寻找女主，女主刻意躲避。",
-        9: "初次追求：男主找到女主，真诚道歉，女主冷漠拒绝，但内心已有波动。",
-        10: "持续努力：男主用各种方式追求（送花、等待、保护等），女主表面不为所动。",
-        11: "心防松动：通过某个事件（如女主遇险），男主奋不顾身，女主心防开始松动。",
-        12: "进退两难：女主内心挣扎，想原谅但怕再次受伤，男主表现出改变和成长。",
-        13: "最后考验：出现新的危机/考验，考验男主的真心，男主证明自己。",
-        14: "冰释前嫌：女主终于原谅，两人坦诚相对，解开所有心结。",
-        15: "甜蜜结局：重新在一起，弥补过去的遗憾，展望美好未来，温馨收尾。",
-    }
+        chapter_goal = _DEFAULT_CHAPTER_GOAL
+    parts.append(f"背景设定：{WORLD_SETTING}")
+    parts.append(f"当前阶段：{arc_theme}（{arc_emotion}）")
+    parts.append(f"本章目标：{chapter_goal}")
+    parts.append(emotion_guide)
     
-    chapter_goal = chapter_goals.get(chapter_index, "推进剧情，深化情感冲突，为下一章做铺垫。")
-    
-    style_block = (
-        "文风要求：情感细腻真实，对话贴近生活，心理描写深入，"
-        "场景描写生动，节奏张弛有度。要让读者有代入感，情绪跟着起伏。"
-        "多用细节展现情感，少用直白说教。虐要虐到心坎，甜要甜到发齁。\n"
-        + style_rules_common_user
-    )
-    
-    structure_block = (
-        "结构为起承转合四段，每段约八百至九百字；"
-        "开头要有钩子吸引读者，结尾要有悬念或情感爆点；"
-        "只输出纯小说正文，不写任何标题、编号、分隔符或元信息。"
-    )
-    
-    word_count_block = "字数为三千四百至三千六百字。"
-    
-    # 添加具体写作技巧
-    technique_block = (
-        "写作技巧：\n"
-        "1. 多用动作和细节展现情感，如'手指微颤''眼眶泛红'等\n"
-        "2. 对话要符合人物性格和当前情绪状态\n"
-        "3. 适当使用倒叙、插叙增加张力\n"
-        "4. 内心独白展现人物真实想法\n"
-        "5. 环境描写烘托情绪氛围"
-    )
-    
-    # 增强人物一致性提示
-    character_consistency_block = ""
+    # 增强人物一致性提示：主要人物的详细档案
     if character_manager:
-        # 获取主要人物的详细档案
-        male_lead = character_manager.get_character_profile("陆景深", chapter_index)
-        female_lead = character_manager.get_character_profile("苏念", chapter_index)
-        
-        if male_lead:
-            traits = male_lead.get("traits")
-            behavior = male_lead.get("chapter_specific", {})
-            if traits:
-                character_consistency_block += f"\n【陆景深人物一致性】\n"
-                character_consistency_block += f"核心性格：{', '.join(traits.core_personality)}\n"
-                character_consistency_block += f"说话习惯：{traits.common_phrases[0] if traits.common_phrases else ''}\n"
-                character_consistency_block += f"行为习惯：{traits.habits[0] if traits.habits else ''}\n"
-                character_consistency_block += f"本章表现：{behavior.get('态度', '')}，{behavior.get('语言', '')}\n"
-        
-        if female_lead:
-            traits = female_lead.get("traits")
-            behavior = female_lead.get("chapter_specific", {})
-            if traits:
-                character_consistency_block += f"\n【苏念人物一致性】\n"
-                character_consistency_block += f"核心性格：{', '.join(traits.core_personality)}\n"
-                character_consistency_block += f"说话习惯：{traits.common_phrases[0] if traits.common_phrases else ''}\n"
-                character_consistency_block += f"行为习惯：{traits.habits[0] if traits.habits else ''}\n"
-                character_consistency_block += f"本章表现：{behavior.get('态度', '')}，{behavior.get('语言', '')}\n"
+        for lead_name in ("陆景深", "苏念"):
+            profile = character_manager.get_character_profile(lead_name, chapter_index)
+            if not profile:
+                continue
+            traits = profile.get("traits")
+            if not traits:
+                continue
+            behavior = profile.get("chapter_specific", {})
+            parts.append(
+                f"【{lead_name}人物一致性】\n"
+                f"核心性格：{', '.join(traits.core_personality)}\n"
+                f"说话习惯：{traits.common_phrases[0] if traits.common_phrases else ''}\n"
+                f"行为习惯：{traits.habits[0] if traits.habits else ''}\n"
+                f"本章表现：{behavior.get('态度', '')}，{behavior.get('语言', '')}"
+            )
     
     # 增强场景和节奏提示
-    scene_rhythm_block = ""
     if scene_manager:
         scene_prompt = scene_manager.get_scene_prompt(chapter_index)
         if scene_prompt:
-            scene_rhythm_block = f"\n【场景与节奏指导】\n{scene_prompt}\n"
+            parts.append(f"【场景与节奏指导】\n{scene_prompt}")
     
-    user_prompt = (
-        f"请写第{chapter_index}章正文。\n"
-        f"{summary_block}"
-        f"{character_block}"
-        f"{emotion_block}\n"
-        f"{recent_block}"
-        f"背景设定：{WORLD_SETTING}\n"
-        f"当前阶段：{current_arc.get('theme', '')}（{current_arc.get('emotion', '')}）\n"
-        f"本章目标：{chapter_goal}\n"
-        f"{emotion_guide}\n"
-        f"{character_consistency_block}"
-        f"{scene_rhythm_block}"
-        f"{style_block}\n"
-        f"{technique_block}\n"
-        f"{structure_block}\n{word_count_block}"
-    )
+    parts.append(_FIXED_TAIL_BLOCK)
+    user_prompt = "\n".join(parts)
     
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "你是一位擅长现代都市情感小说创作的作家，尤其精通虐恋、追妻流等题材。"
-                "你的作品情感真挚，虐点精准，能够深深打动读者的心。"
-                "你懂得如何营造情感张力，制造冲突和转折。\n"
-                + style_rules_common_system + "\n"
-                + PLATFORM_VALUES
-            ),
-        },
+        _SYSTEM_MSG_ROMANCE,
         {"role": "user", "content": user_prompt},
     ]
     return messages
 
 
+# 概要请求的 system 消息同样只读共用
+_SUMMARY_SYSTEM_MSG = {"role": "system", "content": "你是专业的情感小说编辑，擅长提炼剧情要点和情感脉络。"}
+
+
 def build_summary_messages(chapter_text: str) -> List[Dict[str, str]]:
     """
     生成章节概要
@@ -249,6 +260,6 @@ def build_summary_messages(chapter_text: str) -> List[Dict[str, str]]:
         "【正文】\n" + chapter_text
     )
     return [
-        {"role": "system", "content": "你是专业的情感小说编辑，擅长提炼剧情要点和情感脉络。"},
+        _SUMMARY_SYSTEM_MSG,
         {"role": "user", "content": prompt},
     ]
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+百度 OAuth 访问令牌的磁盘缓存（审核客户端与 ERNIE 客户端共用）
+
+缓存文件是一个 JSON 对象：AK/SK 哈希 -> {"access_token", "expiry"}。
+读-改-写在文件锁内进行，临时文件（0600）+ os.replace 原子替换，多进程同时刷新令牌也不会互相覆盖。
+缓存只是优化，读写失败一律忽略。
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # 非 POSIX 平台无文件锁，仍靠 os.replace 原子替换
+    fcntl = None
+
+
+def token_cache_key(api_key: str, secret_key: str) -> str:
+    """缓存条目的键：AK/SK 的 sha256，文件中不出现明文密钥"""
+    return hashlib.sha256(f"{api_key}:{secret_key}".encode("utf-8")).hexdigest()
+
+
+def read_token_cache(path: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_cached_token(path: Path, cache_key: str) -> Optional[Dict[str, Any]]:
+    """读取一条缓存的令牌，返回 {"access_token", "expiry"}；没有或格式不对时返回 None"""
+    cached = read_token_cache(path).get(cache_key)
+    if isinstance(cached, dict) and cached.get("access_token"):
+        return cached
+    return None
+
+
+def _update_token_cache(path: Path, update: Callable[[Dict[str, Dict[str, Any]]], None]) -> None:
+    """文件锁内读-改-写：先清掉已过期的条目，再由 update 修改，最后原子替换"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{path}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            now = time.time()
+            data = {
+                k: v for k, v in read_token_cache(path).items()
+                if isinstance(v, dict) and v.get("expiry", 0) > now
+            }
+            update(data)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def store_cached_token(path: Path, cache_key: str, token: str, expiry: float) -> None:
+    """写入（或覆盖）一条令牌"""
+    def _set(data: Dict[str, Dict[str, Any]]) -> None:
+        data[cache_key] = {"access_token": token, "expiry": expiry}
+
+    _update_token_cache(path, _set)
+
+
+def drop_cached_token(path: Path, cache_key: str) -> None:
+    """删除一条令牌（服务端判定失效时调用，下次重新换取）"""
+    _update_token_cache(path, lambda data: data.pop(cache_key, None))
@@ -15,30 +15,137 @@
 
 from __future__ import annotations
 
+import atexit
 import os
 import sys
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Tuple, Optional, List, Dict, Any
-from datetime import datetime
+from typing import Tuple, Optional, List, Dict, Any, Iterable, Iterator, Sequence
+import time
 import json
 import re
 
 from text_censor_batch import (
     BaiduTextCensor,
+    CensorCache,
     load_env_file,
     read_text_file,
     analyze_censor_result,
     extract_hit_words,
+    split_sentences,
     auto_repair_text,
+    RepairTooLargeError,
 )
 try:
     from novel_runner.client import BaiduErnieClient  # type: ignore
 except Exception:  # noqa: BLE001
     BaiduErnieClient = None  # type: ignore
+try:
+    import orjson  # type: ignore
+except ImportError:  # 可选依赖 orjson，缺失时使用标准库 json
+    orjson = None
+
+
+def _json_line(record: Dict[str, Any]) -> str:
+    """序列化为一行 JSONL（中文不转义）"""
+    if orjson is not None:
+        return orjson.dumps(record).decode("utf-8") + "\n"
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# 多章并发审核时，同时在途的审核请求数上限（避免超出百度接口 QPS）
+_CENSOR_SLOTS = threading.BoundedSemaphore(int(os.getenv('CENSOR_MAX_CONCURRENCY', '4')))
+
+
+# 审核结论缓存（正文 sha256 -> 接口原始返回，带有效期），与 text_censor_batch 共用同一格式；首次审核时才加载
+_CENSOR_CACHE_PATH = Path(__file__).resolve().parent / "outputs_romance" / "audit" / "censor_cache.jsonl"
+_censor_cache: Optional[CensorCache] = None
+_censor_cache_lock = threading.Lock()
+
+
+def _get_censor_cache() -> CensorCache:
+    global _censor_cache
+    with _censor_cache_lock:
+        if _censor_cache is None:
+            _censor_cache = CensorCache(_CENSOR_CACHE_PATH)
+        return _censor_cache
+
+
+def _censor_cached(censor: BaiduTextCensor, text: str) -> Dict[str, Any]:
+    """带内容寻址缓存的审核调用；接口报错或审核失败（conclusionType=4）的结果不缓存"""
+    cache = _get_censor_cache()
+    cached = cache.get(text)
+    if cached is not None:
+        return cached
+    with _CENSOR_SLOTS:
+        result = censor.censor_text(text)
+    cache.put(text, result)
+    return result
+
+
+# 段落预审只在改动段落占全文的比例不超过该值时使用，改动多时省下的字节有限
+_PARTIAL_CENSOR_MAX_SHARE = 0.2
+
+
+def _flagged_sentences(text: str, hit_words: Sequence[str]) -> List[str]:
+    """接口判定不合规时，正文中包含命中词的句子（去掉首尾空白，空句不计）"""
+    flagged = []
+    for sent in split_sentences(text):
+        sent = sent.strip()
+        if sent and any(w in sent for w in hit_words):
+            flagged.append(sent)
+    return flagged
 
 
+def _censor_revision(
+    censor: BaiduTextCensor,
+    current: str,
+    previous: Optional[str],
+    last_hits: Sequence[str] = (),
+    last_flagged: Sequence[str] = (),
+    last_detail: str = "",
+    allow_local: bool = True,
+) -> Tuple[bool, str, bool]:
+    """
+    审核一轮修复后的文本，结论始终以整章为准。
+    段落预审：改动段落里仍含上一轮命中词（多半还会被判违规）且只占全文一小部分时，先只送审改动段落，
+    未通过即以一次小请求结束本轮；通过再审全文。其余情况（最常见的是修复已去掉命中词）直接审全文，
+    通过的轮次只需 1 次请求。
+    本地预检只用于判定"必然不通过"：上一轮接口判定违规时含命中词的句子全部原样留在正文中
+    （修复没有改动任何可疑句子），沿用上一轮结论，不再请求接口。
+    只要有一句被改动就交给接口判断（同一个词换了语境可能合规）；且不连续两轮本地判定，
+    避免误判一直延续到轮次上限。
+    返回 (是否合规, 结论详情, 是否为本地判定)。
+    """
+    if previous is not None:
+        if allow_local and last_flagged and all(sent in current for sent in last_flagged):
+            return False, last_detail, True
+        prev_paragraphs = set(previous.split("\n"))
+        changed = [p for p in current.split("\n") if p.strip() and p not in prev_paragraphs]
+        changed_text = "\n".join(changed)
+        if (
+            changed
+            and len(changed_text) <= len(current) * _PARTIAL_CENSOR_MAX_SHARE
+            and any(w in changed_text for w in last_hits)
+        ):
+            ok, detail = analyze_censor_result(_censor_cached(censor, changed_text))
+            if not ok:
+                return ok, detail, False
+    ok, detail = analyze_censor_result(_censor_cached(censor, current))
+    return ok, detail, False
+
+
+@lru_cache(maxsize=1)
+def _load_env() -> Dict[str, str]:
+    return load_env_file(Path('.env'))
+
+
+@lru_cache(maxsize=1)
 def _prepare_clients() -> Tuple[BaiduTextCensor, Optional["BaiduErnieClient"]]:
-    env = load_env_file(Path('.env'))
+    """构造审核与修复客户端；进程内只构造一次，access token 随实例复用"""
+    env = _load_env()
     text_ak = env.get('TEXT_API_KEY') or os.getenv('TEXT_API_KEY')
     text_sk = env.get('TEXT_SECRET_KEY') or os.getenv('TEXT_SECRET_KEY')
     if not text_ak or not text_sk:
@@ -57,12 +164,20 @@ def censor_and_repair_chapter(
     model: str = 'ernie-4.5-turbo-128k',
     max_rounds: int = 10,
     audit_log_path: Optional[Path] = None,
+    censor: Optional[BaiduTextCensor] = None,
+    llm: Optional["BaiduErnieClient"] = None,
+    keep_intermediate: bool = False,
 ) -> Tuple[bool, Path]:
     """
     对单章执行：审核 → 如不合规仅改命中词所在句子 → 复审，直至通过或达上限。
     返回 (是否合规, 最终文件路径)。
+    censor/llm 缺省时使用进程内缓存的客户端。
+    修复过程只在内存中进行，结束时写一次结果文件；keep_intermediate=True 时在结束时一并写出各轮中间稿。
     """
-    censor, llm = _prepare_clients()
+    if censor is None:
+        censor, cached_llm = _prepare_clients()
+        if llm is None:
+            llm = cached_llm
     if not file_path.exists():
         raise FileNotFoundError(file_path)
     original = read_text_file(file_path)
@@ -72,21 +187,32 @@ def censor_and_repair_chapter(
     fail_suffix = "_审核失败"
     base_stem = f"{chapter_no}-{title}" if chapter_no else (file_path.stem)
     sanitized_stem = _sanitize_filename(base_stem)
-    failed_name = f"{sanitized_stem}{fail_suffix}{file_path.suffix}"
-    final_name = f"{sanitized_stem}{file_path.suffix}"
+    # 成功/失败时的目标路径与章节一一对应，循环外一次算好
+    fail_target = file_path.with_name(f"{sanitized_stem}{fail_suffix}{file_path.suffix}")
+    final_target = file_path.with_name(f"{sanitized_stem}{file_path.suffix}")
 
     current = original
-    out_path: Optional[Path] = None
+    previous: Optional[str] = None  # 上一轮修复前的文本
+    rounds: List[str] = []  # 各轮修复稿，第 i 项对应 round{i+1}
+    hits: List[str] = []
+    flagged: List[str] = []  # 最近一次接口判定违规的句子
+    local_verdict = False  # 本轮结论是否为本地预检沿用
+    detail = ""
+    repair_blocked = False  # 文本过长无法自动修复时，下一轮直接按不合规收尾
     for round_idx in range(max_rounds + 1):
-        result = censor.censor_text(current)
-        ok, detail = analyze_censor_result(result)
+        ok, detail, local_verdict = _censor_revision(
+            censor, current, previous, hits, flagged, detail, allow_local=not local_verdict
+        )
         if ok:
-            # 写回
-            if out_path is None:
-                # 成功时命名应为 “第X章-标题.md”，若当前文件名包含“审核失败/修复_round”等，统一收敛
-                target = file_path.with_name(final_name)
-                out_path = target
-            out_path.write_text(current, encoding='utf-8')
+            # 写回：成功时命名应为 “第X章-标题.md”，若当前文件名包含“审核失败/修复_round”等，统一收敛
+            if keep_intermediate:
+                _write_rounds(fail_target, rounds)
+            out_path = final_target
+            if rounds or file_path != final_target:
+                out_path.write_text(current, encoding='utf-8')
+                if inplace and file_path != final_target:
+                    # 原地模式下由收敛后的文件取代原文件
+                    file_path.unlink(missing_ok=True)
             # 若存在失败记录, 写入修复完成日志
             _append_audit_log(audit_log_path, {
                 "timestamp": _now(),
@@ -99,18 +225,17 @@ def censor_and_repair_chapter(
             })
             return True, out_path
         # 需要修复
-        if llm is None or round_idx >= max_rounds:
+        if llm is None or round_idx >= max_rounds or repair_blocked:
             # 无法修复或超限
-            if out_path is None:
-                # 首次失败时重命名为“第X章-标题_审核失败.md”
-                fail_target = file_path.with_name(failed_name)
-                try:
-                    if file_path.name != fail_target.name:
-                        file_path.rename(fail_target)
-                        file_path = fail_target
-                except Exception:
-                    pass
-                out_path = file_path
+            # 最终确认不合规时才把原文件标记为“第X章-标题_审核失败.md”
+            file_path = _mark_failed(file_path, fail_target)
+            out_path = file_path
+            if rounds:
+                # 保留最后一轮修复稿，文件名同逐轮落盘时的最后一份
+                if keep_intermediate:
+                    _write_rounds(fail_target, rounds[:-1])
+                out_path = _round_path(fail_target, len(rounds))
+                out_path.write_text(current, encoding='utf-8')
             _append_audit_log(audit_log_path, {
                 "timestamp": _now(),
                 "status": "non_compliant",
@@ -123,15 +248,8 @@ def censor_and_repair_chapter(
             })
             return False, out_path
         hits = extract_hit_words(detail)
-        # 首次失败时，立即重命名标记“审核失败”
-        if round_idx == 0:
-            fail_target = file_path.with_name(failed_name)
-            try:
-                if file_path.name != fail_target.name:
-                    file_path.rename(fail_target)
-                    file_path = fail_target
-            except Exception:
-                pass
+        if not local_verdict:
+            flagged = _flagged_sentences(current, hits)
         # 写入失败日志（中间轮次）
         _append_audit_log(audit_log_path, {
             "timestamp": _now(),
@@ -142,30 +260,110 @@ def censor_and_repair_chapter(
             "old_filename": str(file_path.name),
             "round": round_idx + 1,
         })
-        current = auto_repair_text(
-            repair_client=llm,
-            model=model,
-            original_text=current,
-            violation_hint=detail,
-            hit_words=hits,
-        )
-        # 保存中间轮次
-        tmp = file_path.with_name(f"{file_path.stem}_修复_round{round_idx+1}{file_path.suffix}")
-        tmp.write_text(current, encoding='utf-8')
-        out_path = tmp
+        try:
+            repaired = auto_repair_text(
+                repair_client=llm,
+                model=model,
+                original_text=current,
+                violation_hint=detail,
+                hit_words=hits,
+            )
+        except RepairTooLargeError:
+            # 文本未变，下一轮复用本轮结论（被判违规的句子仍在时不再请求接口）
+            repair_blocked = True
+            continue
+        previous = current
+        current = repaired
+        rounds.append(current)
+
+    return False, file_path
+
+
+def _mark_failed(file_path: Path, fail_target: Path) -> Path:
+    """重命名为“审核失败”文件名，返回重命名后的路径（已是目标名时不触碰文件系统）"""
+    if file_path == fail_target:
+        return file_path
+    try:
+        file_path.rename(fail_target)
+    except OSError:
+        return file_path
+    return fail_target
 
-    return False, out_path or file_path
+
+def _safe_extract_hits(detail: str) -> List[str]:
+    try:
+        return extract_hit_words(detail)
+    except Exception:
+        return []
+
+
+def _round_path(file_path: Path, round_no: int) -> Path:
+    return file_path.with_name(f"{file_path.stem}{_ROUND_MARK}{round_no}{file_path.suffix}")
+
+
+def _write_rounds(file_path: Path, rounds: List[str]) -> None:
+    """结束时一次性写出各轮中间稿"""
+    template = str(file_path.with_name(f"{file_path.stem}{_ROUND_MARK}{{}}{file_path.suffix}"))
+    for i, text in enumerate(rounds, 1):
+        Path(template.format(i)).write_text(text, encoding='utf-8')
+
+
+def censor_and_repair_chapters(
+    paths: Iterable[Path],
+    *,
+    inplace: bool = True,
+    max_workers: int = 8,
+    **kwargs: Any,
+) -> Iterator[Tuple[Path, bool, Path]]:
+    """
+    多章并发执行 censor_and_repair_chapter（网络请求为主，线程即可并行）。
+    按完成先后逐个产出 (原文件路径, 是否合规, 最终文件路径)；任一章异常时向上抛出。
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    # 在主线程先构造客户端，各工作线程共用同一实例
+    if kwargs.get('censor') is None:
+        censor, llm = _prepare_clients()
+        kwargs['censor'] = censor
+        kwargs.setdefault('llm', llm)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as ex:
+        futures = {
+            ex.submit(censor_and_repair_chapter, p, inplace=inplace, **kwargs): p
+            for p in paths
+        }
+        for fut in as_completed(futures):
+            ok, outp = fut.result()
+            yield futures[fut], ok, outp
+
+
+def list_chapter_files(directory: Path) -> List[Path]:
+    """列出目录下待审核的章节 md 文件（按文件名排序，跳过逐轮修复稿）"""
+    with os.scandir(directory) as it:
+        names = [
+            e.name for e in it
+            if e.name.endswith('.md') and _ROUND_MARK not in e.name and e.is_file()
+        ]
+    names.sort()
+    return [directory / name for name in names]
+
+
+# 文件名中需删除的字符：非法字符与空格（空格先删再 strip，结果与先 strip 再删一致）
+_FILENAME_DELETE = str.maketrans("", "", '\\/:*?"<>| ')
+_CHAPTER_FILE_RE = re.compile(r"^(第\d+章)[-_—]*(.+)?\.md$")
+_CHAPTER_STEM_RE = re.compile(r"^(第\d+章)")
+# 逐轮修复稿的文件名标记（见 _round_path），批量审核时不作为章节
+_ROUND_MARK = "_修复_round"
 
 
 def _sanitize_filename(name: str) -> str:
     # 去除非法与多余空白
-    name = re.sub(r"[\\/:*?\"<>|]", "", name)
-    return name.strip().replace(" ", "")
+    return name.translate(_FILENAME_DELETE).strip()
 
 
 def _infer_chapter_meta(file_path: Path, content: str) -> Tuple[str, str]:
     """推断章节号与标题。优先文件名中的“第X章-标题”，否则从正文首行抓取。"""
-    m = re.match(r"^(第\d+章)[-_—]*(.+)?\.md$", file_path.name)
+    m = _CHAPTER_FILE_RE.match(file_path.name)
     if m:
         chapter_no = m.group(1)
         title = (m.group(2) or "无题").replace("_审核失败", "").replace("_修复", "")
@@ -175,7 +373,7 @@ def _infer_chapter_meta(file_path: Path, content: str) -> Tuple[str, str]:
     # 简化为最多12字
     title = first_line[:12] if first_line else "无题"
     # 尝试从文件夹顺序中获取“第X章”，否则空
-    m2 = re.match(r"^(第\d+章)", file_path.stem)
+    m2 = _CHAPTER_STEM_RE.match(file_path.stem)
     chapter_no = m2.group(1) if m2 else ""
     if not chapter_no:
         # 最后保底
@@ -183,23 +381,57 @@ def _infer_chapter_meta(file_path: Path, content: str) -> Tuple[str, str]:
     return chapter_no, title or "无题"
 
 
+# 审核日志文件句柄在进程内常驻复用，退出时统一关闭。
+# 句柄按行缓冲：每条记录写完即交给操作系统，进程崩溃或被杀也不丢审计记录；
+# CENSOR_AUDIT_FSYNC=1 时再逐条 fsync，连机器掉电也不丢
+_AUDIT_FH: Dict[Path, Any] = {}
+_AUDIT_LOCK = threading.Lock()
+_AUDIT_FSYNC = os.getenv("CENSOR_AUDIT_FSYNC", "") == "1"
+
+
+def _close_audit_logs() -> None:
+    with _AUDIT_LOCK:
+        for fh in _AUDIT_FH.values():
+            try:
+                fh.close()
+            except Exception:
+                pass
+        _AUDIT_FH.clear()
+
+
+atexit.register(_close_audit_logs)
+
+
 def _append_audit_log(audit_log_path: Optional[Path], record: Dict[str, Any]) -> None:
     if audit_log_path is None:
         # 默认日志位置：outputs_romance/audit/censor_failures.jsonl
-        base = Path(__file__).resolve().parent / "outputs_romance" / "audit"
-        base.mkdir(parents=True, exist_ok=True)
-        audit_log_path = base / "censor_failures.jsonl"
-    else:
-        audit_log_path.parent.mkdir(parents=True, exist_ok=True)
+        audit_log_path = Path(__file__).resolve().parent / "outputs_romance" / "audit" / "censor_failures.jsonl"
+    line = _json_line(record)
     try:
-        with audit_log_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with _AUDIT_LOCK:
+            fh = _AUDIT_FH.get(audit_log_path)
+            if fh is None:
+                audit_log_path.parent.mkdir(parents=True, exist_ok=True)
+                fh = _AUDIT_FH[audit_log_path] = audit_log_path.open("a", encoding="utf-8", buffering=1)
+            fh.write(line)
+            if _AUDIT_FSYNC:
+                os.fsync(fh.fileno())
     except Exception:
         pass
 
 
+# 同一秒内复用已格式化的时间戳（元组整体替换，多线程读写安全）
+_LAST_STAMP: Tuple[int, str] = (-1, "")
+
+
 def _now() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    global _LAST_STAMP
+    sec = int(time.time())
+    stamp = _LAST_STAMP
+    if stamp[0] != sec:
+        stamp = (sec, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec)))
+        _LAST_STAMP = stamp
+    return stamp[1]
 
 
 def _main(argv: list[str]) -> None:
@@ -223,8 +455,7 @@ def _main(argv: list[str]) -> None:
     if target is None:
         print('缺少 --file 或 --dir'); return
     if is_dir:
-        for p in sorted(target.glob('*.md')):
-            ok, outp = censor_and_repair_chapter(p, inplace=inplace)
+        for p, ok, outp in censor_and_repair_chapters(list_chapter_files(target), inplace=inplace):
             print(f"[{p.name}] → {'合规' if ok else '未通过'} → {outp}")
     else:
         ok, outp = censor_and_repair_chapter(target, inplace=inplace)
@@ -10,9 +10,9 @@ from pathlib import Path
 from novel_runner.runner_romance import main
 
 try:
-    from romance_censor_integration import censor_and_repair_chapter
+    from romance_censor_integration import censor_and_repair_chapters, list_chapter_files
 except Exception:
-    censor_and_repair_chapter = None  # type: ignore
+    censor_and_repair_chapters = None  # type: ignore
 
 
 def _auto_censor_after_generation() -> None:
@@ -20,13 +20,13 @@ def _auto_censor_after_generation() -> None:
     base = Path(__file__).resolve().parent / "outputs_romance" / "chapters"
     if not base.exists():
         return
-    if censor_and_repair_chapter is None:
+    if censor_and_repair_chapters is None:
         print("[审核] 跳过：未找到审核修复模块。")
         return
     print("\n[审核] 开始批量合规检测与自动修复…")
     count = 0
-    for p in sorted(base.glob("*.md")):
-        ok, outp = censor_and_repair_chapter(p, inplace=True)
+    # 各章互不依赖，并发提交审核与修复，按完成顺序输出
+    for p, ok, outp in censor_and_repair_chapters(list_chapter_files(base), inplace=True):
         print(f"[审核] {p.name} → {'合规' if ok else '未通过'} → {outp}")
         count += 1
     if count == 0:
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+测试审核/修复流程中的本地逻辑（不访问网络，审核接口与大模型均以假客户端代替）
+"""
+import json
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目路径（重复导入时不再累加，避免拉长 sys.path 搜索）
+_THIS = str(Path(__file__).parent)
+if _THIS not in sys.path:
+    sys.path.insert(0, _THIS)
+
+import romance_censor_integration
+from text_censor_batch import (
+    _DedupCensor,
+    _TokenBucket,
+    _repair_hit_sentences,
+    auto_repair_text,
+    merge_censor_results,
+    split_for_censor,
+)
+
+
+class FakeCensor:
+    """假审核接口：正文含“坏人”判不合规（命中词“坏”），记录每次送审的文本"""
+
+    def __init__(self):
+        self.calls = []
+
+    def censor_text(self, text):
+        self.calls.append(text)
+        if "坏人" in text:
+            return {
+                "conclusionType": 2,
+                "conclusion": "不合规",
+                "data": [{"type": 12, "msg": "存在低俗辱骂", "hits": [{"words": ["坏"]}]}],
+            }
+        return {"conclusionType": 1, "conclusion": "合规"}
+
+
+class FakeRepairLLM:
+    """假修复模型（句子级修复）：
+
+    - fix="all": 每次把所有待修订句子里的“坏人”改为“好人”
+    - fix="one": 每次只改第一句
+    - fix="reword_first": 第一次只改写措辞、保留命中词（“坏人”→“坏人啊”），之后同 all
+    """
+
+    def __init__(self, fix="all"):
+        self.fix = fix
+        self.calls = 0
+
+    def chat_completions(self, **kwargs):
+        self.calls += 1
+        content = kwargs["messages"][1]["content"]
+        items = json.loads(content.split("【待修订句子】\n", 1)[1])
+        fixed = []
+        changed = False
+        for item in items:
+            text = item["text"]
+            if "坏人" in text and not (self.fix == "one" and changed):
+                if self.fix == "reword_first" and self.calls == 1:
+                    text = text.replace("坏人", "坏人啊")
+                else:
+                    text = text.replace("坏人", "好人")
+                changed = True
+            fixed.append({"id": item["id"], "text": text})
+        return {"result": json.dumps(fixed, ensure_ascii=False)}
+
+
+class ScriptedLLM:
+    """假模型：按顺序返回预设的回复文本，记录每次请求的用户消息"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def chat_completions(self, **kwargs):
+        self.prompts.append(kwargs["messages"][1]["content"])
+        return {"result": self.replies.pop(0)}
+
+
+def _run_chapter(tmp_dir, text, fix):
+    # 审核结论缓存指向临时目录并清空，避免读到历史结果或上一个用例的结果
+    romance_censor_integration._CENSOR_CACHE_PATH = tmp_dir / "censor_cache.jsonl"
+    romance_censor_integration._CENSOR_CACHE_PATH.unlink(missing_ok=True)
+    romance_censor_integration._censor_cache = None
+    chapter = tmp_dir / "第1章-测试.md"
+    chapter.write_text(text, encoding="utf-8")
+    censor, llm = FakeCensor(), FakeRepairLLM(fix)
+    ok, out_path = romance_censor_integration.censor_and_repair_chapter(
+        chapter,
+        censor=censor,
+        llm=llm,
+        audit_log_path=tmp_dir / "audit.jsonl",
+        max_rounds=5,
+    )
+    assert ok and "坏人" not in out_path.read_text(encoding="utf-8")
+    out_path.unlink()
+    return [len(t) for t in censor.calls]
+
+
+def test_censor_calls_per_round():
+    """每轮修复后的审核请求数：修复去掉命中词时每轮 1 次全文；改写仍含命中词时先以一次小请求判定"""
+    print("=" * 60)
+    print("测试每轮审核请求数")
+    print("=" * 60)
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="censor_rounds_"))
+    try:
+        filler = "\n\n".join(f"第{i}段平静的叙述，没有任何问题。" for i in range(20))
+        text = f"{filler}\n\n他是坏人。\n\n{filler}\n\n她也是坏人。"
+        full = len(text)
+
+        # 一轮修好：第0轮全文(失败) → 第1轮全文(通过)，不做多余的段落预审
+        sizes = _run_chapter(tmp_dir, text, "all")
+        print(f"一轮修好：各次送审长度 {sizes}")
+        assert sizes == [full, full]
+
+        # 每轮只修一句：剩下的违规在未改动的段落里，段落预审帮不上忙，每轮仍只审一次全文
+        sizes = _run_chapter(tmp_dir, text, "one")
+        print(f"逐句修好：各次送审长度 {sizes}")
+        assert len(sizes) == 3 and all(n == full for n in sizes)
+
+        # 改写后仍含命中词：只送审改动段落，一次小请求判定失败；下一轮修好后审全文
+        sizes = _run_chapter(tmp_dir, text, "reword_first")
+        print(f"改写仍含命中词：各次送审长度 {sizes}")
+        assert len(sizes) == 3 and sizes[0] == full and sizes[1] < full * 0.2 < sizes[2]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    return True
+
+
+def test_split_and_merge():
+    """超长文本按段落切分：每段不超过字节上限、拼回即原文；各段结论取最严重的一段"""
+    print("\n" + "=" * 60)
+    print("测试分段审核的切分与合并")
+    print("=" * 60)
+
+    text = "\n\n".join(f"第{i}段" + "平静的叙述" * 12 for i in range(40))
+    chunks = split_for_censor(text, max_bytes=600)
+    sizes = [len(c.encode("utf-8")) for c in chunks]
+    print(f"按段落切分：{len(text.encode('utf-8'))} 字节 → {len(chunks)} 段，最大 {max(sizes)} 字节")
+    assert "".join(chunks) == text
+    assert len(chunks) > 1 and max(sizes) <= 600
+    # 段落边界不被切断：除最后一段外，每段都以分隔空行结尾
+    assert all(c.endswith("\n\n") for c in chunks[:-1])
+
+    # 单段超长时按字符硬切，不切断多字节字符
+    para = "长" * 500
+    chunks = split_for_censor(para, max_bytes=600)
+    assert "".join(chunks) == para
+    assert [len(c.encode("utf-8")) for c in chunks] == [600, 600, 300]
+    assert split_for_censor("短文本") == ["短文本"]
+    # emoji 等 4 字节字符：按实际字节数判断，默认上限下同样切分
+    emoji = "😀" * 6000
+    chunks = split_for_censor(emoji)
+    assert "".join(chunks) == emoji
+    assert max(len(c.encode("utf-8")) for c in chunks) <= 18000 and len(chunks) == 2
+
+    ok = {"conclusionType": 1, "conclusion": "合规"}
+    suspect = {"conclusionType": 3, "conclusion": "疑似", "data": [{"type": 12, "msg": "疑似低俗"}]}
+    bad = {"conclusionType": 2, "conclusion": "不合规", "data": [{"type": 12, "msg": "存在低俗辱骂"}]}
+    failed = {"conclusionType": 4, "conclusion": "审核失败"}
+    merged = merge_censor_results([ok, suspect, bad, failed])
+    print(f"合并结论：{merged['conclusion']}，明细 {len(merged['data'])} 条")
+    assert merged["conclusionType"] == 2
+    assert merged["data"] == suspect["data"] + bad["data"]
+    assert merge_censor_results([ok, failed, suspect])["conclusionType"] == 4
+    assert merge_censor_results([ok, ok]) == ok
+    # 任一段接口出错时直接返回该错误
+    error = {"error_code": 18, "error_msg": "Open api qps request limit reached"}
+    assert merge_censor_results([bad, error]) is error
+
+    return True
+
+
+def test_repair_hit_sentences():
+    """句子级修复：只把含命中词的句子发给模型并按编号拼回；回复无法解析时返回 None 以退回整篇改写"""
+    print("\n" + "=" * 60)
+    print("测试句子级修复")
+    print("=" * 60)
+
+    text = "  他是坏人。\n她很好。\n坏人走了！"
+    hint = "命中词: 坏"
+
+    # 只改命中句；不在待修订编号内的条目（id=2，“她很好。”）被忽略，原句首尾空白保留
+    llm = ScriptedLLM(
+        '好的：[{"id": 0, "text": "他是好人。"}, {"id": 2, "text": "被改掉了"}, {"id": 4, "text": " 好人走了！ "}]'
+    )
+    fixed = _repair_hit_sentences(llm, "m", text, hint, ["坏"])
+    print(f"拼回结果：{fixed!r}")
+    assert fixed == "  他是好人。\n她很好。\n好人走了！"
+    sent_payload = llm.prompts[0].split("【待修订句子】\n", 1)[1]
+    assert "她很好" not in sent_payload
+
+    # 原文找不到命中词（如模型类违规）：不调用模型
+    llm = ScriptedLLM()
+    assert _repair_hit_sentences(llm, "m", "她很好。", hint, ["坏"]) is None and not llm.prompts
+
+    # 回复无法解析或没有可用条目时返回 None
+    for reply in ("改不了", "[{id: 0, text: 他是好人}]", '[{"id": 2, "text": "她很好。"}]', '[{"id": 0, "text": "  "}]'):
+        assert _repair_hit_sentences(ScriptedLLM(reply), "m", text, hint, ["坏"]) is None, reply
+
+    # auto_repair_text 在句子级回复无法解析时退回整篇改写
+    llm = ScriptedLLM("[not json]", "他是好人。\n她很好。\n好人走了！")
+    fixed = auto_repair_text(llm, "m", text, hint, ["坏"])
+    assert fixed == "他是好人。\n她很好。\n好人走了！"
+    assert len(llm.prompts) == 2 and llm.prompts[1].endswith(text)
+    print("回复格式错误时已退回整篇改写")
+
+    return True
+
+
+class GatedCensor(FakeCensor):
+    """审核前阻塞到 gate 放行，用来让多个相同请求同时在途；fail_first=True 时第一次调用抛异常"""
+
+    def __init__(self, fail_first=False):
+        super().__init__()
+        self.gate = threading.Event()
+        self.fail_first = fail_first
+
+    def censor_text(self, text):
+        self.gate.wait(5)
+        result = super().censor_text(text)
+        if self.fail_first and len(self.calls) == 1:
+            raise ConnectionError("网络中断")
+        return result
+
+
+class _CountingLock:
+    """记录加锁次数的锁，达到 n 次时置位 reached"""
+
+    def __init__(self, n):
+        self._lock = threading.Lock()
+        self._n = n
+        self.count = 0
+        self.reached = threading.Event()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.count += 1
+        if self.count >= self._n:
+            self.reached.set()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def test_dedup_concurrent():
+    """同批并发到达的相同文本只请求一次审核接口，其余请求等待并共享首个结果"""
+    print("\n" + "=" * 60)
+    print("测试同批审核去重")
+    print("=" * 60)
+
+    censor = GatedCensor()
+    dedup = _DedupCensor(censor)
+    texts = ["他是坏人。"] * 8 + ["她很好。"] * 4
+    with ThreadPoolExecutor(max_workers=len(texts)) as ex:
+        futures = [ex.submit(dedup.censor_text, t) for t in texts]
+        censor.gate.set()
+        results = [f.result(5) for f in futures]
+    print(f"{len(texts)} 个请求 → 接口调用 {len(censor.calls)} 次")
+    assert sorted(censor.calls) == sorted(["他是坏人。", "她很好。"])
+    assert all(r["conclusionType"] == 2 for r in results[:8])
+    assert all(r["conclusionType"] == 1 for r in results[8:])
+    # 之后的相同请求直接复用结果
+    dedup.censor_text("他是坏人。")
+    assert len(censor.calls) == 2
+
+    # 请求异常不记忆：等待中的相同请求一同收到异常，之后的调用重新请求接口。
+    # 4 个线程都已进入去重登记（各取一次锁）后才放行，确保它们等的是同一个在途请求
+    censor = GatedCensor(fail_first=True)
+    dedup = _DedupCensor(censor)
+    dedup._lock = _CountingLock(4)
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futures = [ex.submit(dedup.censor_text, "他是坏人。") for _ in range(4)]
+        assert dedup._lock.reached.wait(5)
+        censor.gate.set()
+        errors = [f.exception(5) for f in futures]
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert len(censor.calls) == 1
+    assert dedup.censor_text("他是坏人。")["conclusionType"] == 2
+    assert len(censor.calls) == 2
+    print("请求异常后已重新请求")
+
+    return True
+
+
+class FakeClock:
+    """可控时钟：sleep 只推进时间并记录等待时长"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_pacing():
+    """令牌桶：先放行 1 秒内的突发，之后按 qps 匀速放行；空闲期间积累的令牌不超过容量"""
+    print("\n" + "=" * 60)
+    print("测试审核请求限速")
+    print("=" * 60)
+
+    clock = FakeClock()
+    bucket = _TokenBucket(2.0, clock=clock, sleep=clock.sleep)
+    stamps = []
+    for _ in range(6):
+        bucket.acquire()
+        stamps.append(round(clock.now - 100.0, 6))
+    print(f"qps=2 连续 6 次请求的放行时刻: {stamps}")
+    # 前 2 次为突发，之后每 0.5 秒一次
+    assert stamps == [0.0, 0.0, 0.5, 1.0, 1.5, 2.0]
+
+    # 空闲 10 秒后只积累到容量（2 个），第 3 次又要等待
+    clock.now += 10
+    start = clock.now
+    for _ in range(3):
+        bucket.acquire()
+    assert round(clock.now - start, 6) == 0.5
+
+    # qps < 1 时容量为 1：每次请求间隔 1/qps 秒
+    clock = FakeClock()
+    bucket = _TokenBucket(0.5, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    assert round(clock.now - 100.0, 6) == 4.0
+
+    return True
+
+
+if __name__ == "__main__":
+    test_censor_calls_per_round()
+    test_split_and_merge()
+    test_repair_hit_sentences()
+    test_dedup_concurrent()
+    test_token_bucket_pacing()
+
+    print("\n" + "=" * 60)
+    print("测试完成！")
+    print("=" * 60)
@@ -6,8 +6,10 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目路径
-sys.path.insert(0, str(Path(__file__).parent))
+# 添加项目路径（重复导入时不再累加，避免拉长 sys.path 搜索）
+_THIS = str(Path(__file__).parent)
+if _THIS not in sys.path:
+    sys.path.insert(0, _THIS)
 
 from novel_runner.censor_manager import CensorManager, generate_chapter_title
 from novel_runner.client import BaiduErnieClient
@@ -5,11 +5,8 @@
 from novel_runner.post_processor import clean_chapter_text, extract_clean_summary
 
 
-def test_clean_chapter():
-    """测试章节文本清理"""
-    
-    # 模拟包含杂质的章节输出
-    raw_chapter = """
+# 模拟包含杂质的章节输出
+RAW_CHAPTER = """
 第一章 血触古卷
 
 ---
@@ -31,9 +28,43 @@ def test_clean_chapter():
 写作意图：引出主角进入异世界的契机。
 """
 
-    cleaned = clean_chapter_text(raw_chapter)
+RAW_SUMMARY = """
+前情提要如下：
+
+1. 林风意外穿越异世
+2. 血触古卷认主
+- 初遇神秘势力追杀
+* 展现惊人潜力
+5、结识苏雨等同伴
+• 祭天台上立下誓言
+
+总结：第一章主要讲述了主角的穿越经历。
+"""
+
+# 纯小说内容
+PURE_NOVEL = """
+林风站在祭坛中央，感受着体内气脉的流动。
+
+远处传来钟声，仿佛在召唤着什么。
+
+他深吸一口气，迈步向前。
+"""
+
+# 只有元信息的输入
+META_ONLY = """
+下一章：探索仙门
+写作意图：推进剧情
+---
+===
+"""
+
+
+def test_clean_chapter():
+    """测试章节文本清理"""
+    
+    cleaned = clean_chapter_text(RAW_CHAPTER)
     
-    print("原始文本长度:", len(raw_chapter))
+    print("原始文本长度:", len(RAW_CHAPTER))
     print("清理后长度:", len(cleaned))
     print("\n清理后文本（前500字）:")
     print("-" * 50)
@@ -55,23 +86,10 @@ def test_clean_chapter():
 def test_clean_summary():
     """测试概要提取清理"""
     
-    raw_summary = """
-前情提要如下：
-
-1. 林风意外穿越异世
-2. 血触古卷认主
-- 初遇神秘势力追杀
-* 展现惊人潜力
-5、结识苏雨等同伴
-• 祭天台上立下誓言
-
-总结：第一章主要讲述了主角的穿越经历。
-"""
-
-    cleaned_lines = extract_clean_summary(raw_summary)
+    cleaned_lines = extract_clean_summary(RAW_SUMMARY)
     
     print("\n原始概要:")
-    print(raw_summary)
+    print(RAW_SUMMARY)
     print("\n清理后概要列表:")
     for i, line in enumerate(cleaned_lines, 1):
         print(f"  {i}. {line}")
@@ -90,15 +108,7 @@ def test_edge_cases():
     """测试边缘情况"""
     
     # 测试纯小说内容（不应该被改动）
-    pure_novel = """
-林风站在祭坛中央，感受着体内气脉的流动。
-
-远处传来钟声，仿佛在召唤着什么。
-
-他深吸一口气，迈步向前。
-"""
-    
-    cleaned = clean_chapter_text(pure_novel)
+    cleaned = clean_chapter_text(PURE_NOVEL)
     # 空行可能会被规范化，但内容应该保持
     assert "林风站在祭坛中央" in cleaned
     assert "远处传来钟声" in cleaned
@@ -108,13 +118,7 @@ def test_edge_cases():
     assert extract_clean_summary("") == []
     
     # 测试只有元信息的输入
-    meta_only = """
-下一章：探索仙门
-写作意图：推进剧情
----
-===
-"""
-    assert clean_chapter_text(meta_only).strip() == ""
+    assert clean_chapter_text(META_ONLY).strip() == ""
     
     print("✅ 边缘情况测试通过")
     return True
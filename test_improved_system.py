@@ -5,8 +5,10 @@
 import sys
 from pathlib import Path
 
-# 添加项目路径
-sys.path.insert(0, str(Path(__file__).parent))
+# 添加项目路径（重复导入时不再累加，避免拉长 sys.path 搜索）
+_THIS = str(Path(__file__).parent)
+if _THIS not in sys.path:
+    sys.path.insert(0, _THIS)
 
 from novel_runner.story_manager import StoryManager, Character, PlotThread, WorldDetail
 
@@ -138,6 +140,134 @@ def test_story_manager():
     return True
 
 
+def test_romance_state_roundtrip():
+    """测试追妻流状态存档：快照 + 概要日志的保存、加载与回放"""
+    print("\n" + "=" * 60)
+    print("测试追妻流状态存档")
+    print("=" * 60)
+    
+    import shutil
+    import tempfile
+    import warnings
+    from novel_runner.story_manager_romance import RomanceStoryManager
+    
+    test_dir = Path(tempfile.mkdtemp(prefix="romance_state_"))
+    try:
+        manager = RomanceStoryManager(test_dir)
+        manager.add_chapter_summary(1, ["误会加深", "心碎离开"])
+        manager.save_state(1)
+        manager.update_character_emotion("女主", "决绝", growth="学会放手")
+        manager.add_chapter_summary(2, ["重逢", "甜蜜回忆"])
+        manager.save_state(2)
+        
+        # 加载第1章：只回放日志中第1章及之前的记录
+        loaded = RomanceStoryManager(test_dir, init_defaults=False)
+        assert loaded.load_state(1)
+        assert loaded.chapter_summaries == {1: ["误会加深", "心碎离开"]}
+        assert loaded.emotion_arc == ["第1章：虐心"]
+        
+        # 加载第2章：人物状态来自快照，概要与情感曲线来自日志
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert loaded.load_state(2)
+        assert loaded.chapter_summaries == manager.chapter_summaries
+        assert loaded.emotion_arc == ["第1章：虐心", "第2章：甜蜜"]
+        assert loaded.characters["女主"].emotional_state == "决绝"
+        assert (
+            loaded.get_context_for_chapter(3)["recent_summaries"]
+            == manager.get_context_for_chapter(3)["recent_summaries"]
+        )
+        print("快照与日志回放一致")
+        
+        # 日志末尾残行：跳过并告警
+        with open(test_dir / "romance_log.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"chapter": 3, "summ')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert loaded.load_state(2)
+        assert any("无法解析" in str(w.message) for w in caught)
+        assert loaded.chapter_summaries == manager.chapter_summaries
+        
+        # 日志丢失：快照依赖的概要无法恢复，必须告警而不是静默返回空概要
+        (test_dir / "romance_log.jsonl").unlink()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert loaded.load_state(2)
+        assert any("概要日志不存在" in str(w.message) for w in caught)
+        print("日志损坏/缺失时已告警")
+    finally:
+        shutil.rmtree(test_dir)
+    
+    return True
+
+
+def test_chapter_summaries_api():
+    """测试章节概要按 Dict[int, List[str]] 方式读写（含负数/稀疏章节号与反复覆盖）"""
+    print("\n" + "=" * 60)
+    print("测试章节概要读写")
+    print("=" * 60)
+    
+    import shutil
+    import tempfile
+    
+    test_dir = Path(tempfile.mkdtemp(prefix="story_summaries_"))
+    try:
+        manager = StoryManager(test_dir)
+        manager.add_chapter_summary(-1, ["序章"])
+        manager.add_chapter_summary(100000, ["番外"])
+        manager.chapter_summaries[1] = ["初入异世"]
+        manager.chapter_summaries[1].append("拜师学艺")
+        manager.chapter_summaries[1][0] = "穿越异世"
+        del manager.chapter_summaries[-1]
+        assert manager.chapter_summaries == {100000: ["番外"], 1: ["穿越异世", "拜师学艺"]}
+        # 反复覆盖同一章：作废行被压缩，存储不随覆盖次数增长
+        for i in range(100):
+            manager.add_chapter_summary(1, [f"第{i}次修订"])
+        assert manager.chapter_summaries[1] == ["第99次修订"]
+        assert len(manager._summary_pool) <= 4
+        print(f"概要章节: {sorted(manager.chapter_summaries)}")
+    finally:
+        shutil.rmtree(test_dir)
+    
+    return True
+
+
+def test_context_cache_invalidation():
+    """测试经管理器方法修改人物/线索后，上下文缓存随之失效"""
+    print("\n" + "=" * 60)
+    print("测试上下文缓存失效")
+    print("=" * 60)
+    
+    import shutil
+    import tempfile
+    from novel_runner.story_manager_romance import RomanceStoryManager
+    
+    test_dir = Path(tempfile.mkdtemp(prefix="story_fields_"))
+    try:
+        manager = StoryManager(test_dir)
+        manager.get_context_for_chapter(1)
+        manager.update_character("主角", {"current_state": "身负重伤", "personality": ["隐忍"]})
+        manager.update_plot_thread("主线", status="已解决")
+        context = manager.get_context_for_chapter(1)
+        assert "身负重伤" in context["characters"]["主角"] and "隐忍" in context["characters"]["主角"]
+        assert "主线" not in context["plot_threads"]
+        
+        romance = RomanceStoryManager(test_dir / "romance")
+        name = next(iter(romance.characters))
+        romance.get_context_for_chapter(1)
+        romance.update_character_emotion(name, "心如死灰")
+        thread = next(iter(romance.emotion_threads))
+        romance.add_emotion_event(thread, "雨夜决裂", new_tension=9)
+        context = romance.get_context_for_chapter(1)
+        assert "心如死灰" in context["characters"][name]
+        assert "雨夜决裂" in context["emotion_threads"][thread] and "9/10" in context["emotion_threads"][thread]
+        print("修改后上下文已更新")
+    finally:
+        shutil.rmtree(test_dir)
+    
+    return True
+
+
 def test_improved_prompt():
     """测试改进后的提示词构建"""
     print("\n" + "=" * 60)
@@ -199,6 +329,9 @@ if __name__ == "__main__":
     
     # 运行测试
     test_story_manager()
+    test_romance_state_roundtrip()
+    test_chapter_summaries_api()
+    test_context_cache_invalidation()
     test_improved_prompt()
     
     print("\n" + "=" * 60)
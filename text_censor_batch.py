@@ -5,15 +5,31 @@
 对指定目录下的所有文本文件进行内容审核
 """
 
+import argparse
 import os
 import sys
 import time
 import json
+import random
+import hashlib
+import threading
 import requests
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import re
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # 可选依赖 orjson，缺失时使用标准库 json
+    orjson = None
+
+from novel_runner.token_cache import load_cached_token, store_cached_token, token_cache_key
+
 # 可选：用于自动修复不合规内容的对话大模型客户端（复用项目里的ERNIE客户端）
 try:
     from novel_runner.client import BaiduErnieClient  # type: ignore
@@ -21,24 +37,202 @@ except Exception:  # noqa: BLE001
     BaiduErnieClient = None  # type: ignore
 
 
+# 接口限流时的退避重试：HTTP 429 或百度错误码 18（QPS 超限）
+_QPS_ERROR_CODES = frozenset((18,))
+_RATE_LIMIT_RETRIES = 3
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 8.0
+# 令牌无效/过期（如磁盘缓存的令牌已被吊销）：重新换取令牌后重试一次
+_TOKEN_ERROR_CODES = frozenset((110, 111))
+
+
+class _TokenBucket:
+    """线程安全的令牌桶：按 qps 匀速发放请求许可，允许 1 秒内的突发（clock/sleep 可替换，便于测试）"""
+    
+    def __init__(
+        self,
+        qps: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = qps
+        self.capacity = max(1.0, qps)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def _json_loads(data: bytes):
+    """解析 UTF-8 JSON 字节串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> str:
+    """序列化为 JSON 文本（中文不转义）；indent=True 时缩进 2 格"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+# 访问令牌磁盘缓存（有效期 30 天），按 AK/SK 哈希区分；新进程启动时免去一次 OAuth 请求
+_TOKEN_CACHE_PATH = Path(
+    os.getenv("BAIDU_CENSOR_TOKEN_CACHE") or Path.home() / ".cache" / "baidu_censor_token.json"
+)
+
+
+# 审核接口单次文本上限 20000 字节（UTF-8），超出部分会被截断；留出余量后按段落切分
+_CENSOR_MAX_BYTES = 18000
+_PARAGRAPH_SPLIT_RE = re.compile(r"(\n{2,})")
+# 合并分段结论时的严重程度：不合规 > 审核失败 > 疑似 > 合规
+_CONCLUSION_RANK = {1: 0, 3: 1, 4: 2, 2: 3}
+_SEGMENT_WORKERS = 4
+
+
+def split_for_censor(text: str, max_bytes: int = _CENSOR_MAX_BYTES) -> List[str]:
+    """按段落边界把文本贪心切成不超过 max_bytes 字节的分段（保留分隔空行，拼回即原文）"""
+    # UTF-8 每个字符最多 4 字节（emoji 等 BMP 以外的字符），字符数足够少时免去编码
+    if len(text) * 4 <= max_bytes or len(text.encode("utf-8")) <= max_bytes:
+        return [text]
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+    for piece in _PARAGRAPH_SPLIT_RE.split(text):
+        if not piece:
+            continue
+        n = len(piece.encode("utf-8"))
+        if size + n > max_bytes and buf:
+            chunks.append("".join(buf))
+            buf, size = [], 0
+        if n > max_bytes:
+            # 单段超长：按字符硬切
+            start = 0
+            for i, ch in enumerate(piece):
+                w = len(ch.encode("utf-8"))
+                if size + w > max_bytes:
+                    chunks.append(piece[start:i])
+                    start, size = i, 0
+                size += w
+            buf = [piece[start:]]
+            continue
+        buf.append(piece)
+        size += n
+    if buf:
+        chunks.append("".join(buf))
+    return chunks
+
+
+def merge_censor_results(results: List[Dict]) -> Dict:
+    """合并各分段的审核结果：任一段接口出错即返回该错误；结论取最严重的一段，违规明细合并"""
+    for r in results:
+        if "error_code" in r:
+            return r
+    worst = max(results, key=lambda r: _CONCLUSION_RANK.get(r.get("conclusionType", 1), 0))
+    merged = dict(worst)
+    data: List[Dict] = []
+    for r in results:
+        data.extend(r.get("data") or ())
+    if data:
+        merged["data"] = data
+    return merged
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """限流重试的等待秒数：优先服务端 Retry-After，否则指数退避加抖动"""
+    if retry_after:
+        try:
+            return min(_BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass
+    return min(_BACKOFF_CAP, _BACKOFF_BASE * (2 ** attempt) + random.uniform(0, _BACKOFF_BASE))
+
+
 class BaiduTextCensor:
     """百度文本审核客户端"""
     
-    TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
-    CENSOR_URL = "https://aip.baidubce.com/rest/2.0/solution/v1/text_censor/v2/user_defined"
+    API_ORIGIN = "https://aip.baidubce.com/"
+    TOKEN_URL = API_ORIGIN + "oauth/2.0/token"
+    CENSOR_URL = API_ORIGIN + "rest/2.0/solution/v1/text_censor/v2/user_defined"
+    # 连接池大小：多章并发审核时各线程复用同一组 keep-alive 连接
+    POOL_SIZE = 16
     
-    def __init__(self, api_key: str, secret_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        secret_key: str,
+        qps: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+    ):
         self.api_key = api_key
         self.secret_key = secret_key
+        # 审核请求限速（None 或 <=0 表示不主动限速，仅在被限流时退避重试）
+        self._limiter = _TokenBucket(qps) if qps and qps > 0 else None
         self._access_token: Optional[str] = None
         self._token_expiry: float = 0.0
+        # 并发审核时只让一个线程去换取令牌
+        self._token_lock = threading.Lock()
+        self._token_cache_key = token_cache_key(api_key, secret_key)
+        cached = load_cached_token(_TOKEN_CACHE_PATH, self._token_cache_key)
+        if cached is not None:
+            self._access_token = cached["access_token"]
+            self._token_expiry = float(cached.get("expiry", 0.0))
+        # 复用 TCP/TLS 连接，避免每次请求重新握手（令牌与审核接口同一主机，只需一个连接池）。
+        # 连接失败与 5xx 由 urllib3 退避重试；审核请求无副作用，POST 重试安全。429 在 censor_text 中按限流处理。
+        # 传入共享 session 时只在审核接口主机前缀上挂载本客户端的适配器，不改变其他主机的行为，也不负责关闭
+        self._owns_session = session is None
+        self._session = requests.Session() if session is None else session
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.POOL_SIZE,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(("POST",)),
+                raise_on_status=False,
+            ),
+        )
+        self._session.mount("https://" if self._owns_session else self.API_ORIGIN, adapter)
+    
+    def close(self) -> None:
+        """关闭连接池（共享的 session 由传入方关闭）"""
+        if self._owns_session:
+            self._session.close()
+    
+    def __enter__(self) -> "BaiduTextCensor":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
     
     def _get_access_token(self) -> str:
         """获取访问令牌"""
         # 如果token未过期则直接返回
         if self._access_token and time.time() < (self._token_expiry - 60):
             return self._access_token
-        
+        with self._token_lock:
+            if self._access_token and time.time() < (self._token_expiry - 60):
+                return self._access_token
+            return self._fetch_access_token()
+    
+    def _fetch_access_token(self) -> str:
+        """请求新的访问令牌（调用方需持有 _token_lock）"""
         print("[TOKEN] 正在获取访问令牌...")
         
         params = {
@@ -48,7 +242,7 @@ class BaiduTextCensor:
         }
         
         try:
-            response = requests.post(self.TOKEN_URL, params=params, timeout=10)
+            response = self._session.post(self.TOKEN_URL, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -58,6 +252,7 @@ class BaiduTextCensor:
             self._access_token = data["access_token"]
             expires_in = data.get("expires_in", 2592000)  # 默认30天
             self._token_expiry = time.time() + expires_in
+            store_cached_token(_TOKEN_CACHE_PATH, self._token_cache_key, self._access_token, self._token_expiry)
             
             print(f"[TOKEN] 访问令牌获取成功，有效期: {expires_in}秒")
             return self._access_token
@@ -66,26 +261,194 @@ class BaiduTextCensor:
             raise Exception(f"获取访问令牌失败: {e}")
     
     def censor_text(self, text: str) -> Dict:
-        """审核文本内容"""
-        access_token = self._get_access_token()
-        
-        params = {"access_token": access_token}
+        """审核文本内容（超出接口长度上限时按段落分段并发审核后合并结果）"""
+        chunks = split_for_censor(text)
+        if len(chunks) == 1:
+            return self._censor_once(text)
+        with ThreadPoolExecutor(max_workers=min(_SEGMENT_WORKERS, len(chunks))) as ex:
+            return merge_censor_results(list(ex.map(self._censor_once, chunks)))
+    
+    def _censor_once(self, text: str) -> Dict:
+        """单次请求审核接口"""
+        params = {"access_token": self._get_access_token()}
         data = {"text": text}
+        token_refreshed = False
         
         try:
-            response = requests.post(
-                self.CENSOR_URL, 
-                params=params, 
-                data=data, 
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            for attempt in range(_RATE_LIMIT_RETRIES + 1):
+                if self._limiter is not None:
+                    self._limiter.acquire()
+                response = self._session.post(
+                    self.CENSOR_URL, 
+                    params=params, 
+                    data=data, 
+                    timeout=30
+                )
+                if response.status_code == 429:
+                    if attempt < _RATE_LIMIT_RETRIES:
+                        time.sleep(_backoff_delay(attempt, response.headers.get("Retry-After")))
+                        continue
+                response.raise_for_status()
+                result = _json_loads(response.content)
+                error_code = result.get("error_code")
+                if error_code in _TOKEN_ERROR_CODES and not token_refreshed and attempt < _RATE_LIMIT_RETRIES:
+                    token_refreshed = True
+                    with self._token_lock:
+                        if self._access_token == params["access_token"]:
+                            self._access_token = None
+                    params = {"access_token": self._get_access_token()}
+                    continue
+                if error_code in _QPS_ERROR_CODES and attempt < _RATE_LIMIT_RETRIES:
+                    time.sleep(_backoff_delay(attempt))
+                    continue
+                return result
             
         except Exception as e:
             raise Exception(f"文本审核请求失败: {e}")
 
 
+# 审核结论缓存的默认位置：脚本所在目录（与启动时的工作目录无关）
+_DEFAULT_CENSOR_CACHE_PATH = Path(__file__).resolve().parent / "censor_cache.jsonl"
+# 加载时无效行（过期、被覆盖或损坏）超过该比例则重写缓存文件
+_CACHE_COMPACT_RATIO = 0.5
+
+
+class CensorCache:
+    """
+    审核结论缓存：正文 sha256 -> 接口原始返回，追加写入 JSONL。
+    同一文本在有效期内的结论视为不变，重跑时直接复用；接口报错或审核失败的结果不缓存。
+    加载时无效行过半则只保留有效记录重写文件，避免文件无限增长；追加写复用同一个按行缓冲的句柄。
+    """
+    
+    def __init__(self, path: Path, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Dict]] = {}
+        self._fh = None
+        expire_before = time.time() - ttl_seconds
+        total = 0
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    total += 1
+                    try:
+                        record = _json_loads(line)
+                        if record["ts"] >= expire_before:
+                            self._entries[record["sha256"]] = (record["ts"], record["result"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        if total and total - len(self._entries) > total * _CACHE_COMPACT_RATIO:
+            self._compact()
+    
+    def _compact(self) -> None:
+        """只保留有效记录重写缓存文件（临时文件 + os.replace 原子替换）"""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for key, (ts, result) in self._entries.items():
+                    f.write(_json_dumps({"sha256": key, "ts": ts, "result": result}) + "\n")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def get(self, text: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(self.key(text))
+        if entry is None or entry[0] < time.time() - self.ttl_seconds:
+            return None
+        return entry[1]
+    
+    def put(self, text: str, result: Dict) -> None:
+        if "error_code" in result or result.get("conclusionType") not in (1, 2, 3):
+            return
+        key = self.key(text)
+        ts = time.time()
+        line = _json_dumps({"sha256": key, "ts": ts, "result": result}) + "\n"
+        with self._lock:
+            self._entries[key] = (ts, result)
+            try:
+                if self._fh is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._fh = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._fh.write(line)
+            except OSError:
+                pass
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class _DedupCensor:
+    """
+    批量运行期内按内容去重的审核代理：相同文本只请求一次接口，
+    并发到达的相同请求等待首个请求的结果（请求异常不记忆，后续调用会重试）。
+    """
+    
+    def __init__(self, censor_client: BaiduTextCensor):
+        self._censor_client = censor_client
+        self._lock = threading.Lock()
+        self._results: Dict[bytes, Future] = {}
+    
+    def censor_text(self, text: str) -> Dict:
+        key = text_digest(text)
+        with self._lock:
+            fut = self._results.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._results[key] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            result = self._censor_client.censor_text(text)
+        except BaseException as e:
+            with self._lock:
+                del self._results[key]
+            fut.set_exception(e)
+            raise
+        fut.set_result(result)
+        return result
+
+
+def text_digest(text: str) -> bytes:
+    """
+    文本内容的 16 字节 blake2b 摘要，用作内存中的判重键
+    （修复轮次间判重、同批相同内容去重、修复结果记忆）；不用于持久化缓存（见 CensorCache.key）。
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def censor_with_cache(
+    censor_client: BaiduTextCensor,
+    text: str,
+    cache: Optional[CensorCache],
+    log: Callable[[str], None] = print,
+) -> Dict:
+    """
+    审核文本：缓存命中则直接返回，否则请求接口并写入缓存。
+    cache 为 None 时等同直接调用 censor_text；log 用于输出进度（批量模式下传入各文件的日志缓冲）。
+    """
+    if cache is not None:
+        cached = cache.get(text)
+        if cached is not None:
+            log("  🔍 审核结论命中缓存")
+            return cached
+    log("  🔍 正在调用审核接口...")
+    result = censor_client.censor_text(text)
+    if cache is not None:
+        cache.put(text, result)
+    return result
+
+
 def load_env_file(env_path: Path) -> Dict[str, str]:
     """加载.env文件"""
     env_vars = {}
@@ -93,9 +456,11 @@ def load_env_file(env_path: Path) -> Dict[str, str]:
         with open(env_path, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    env_vars[key.strip()] = value.strip().strip('"').strip("'")
+                if not line or line[0] == '#':
+                    continue
+                key, sep, value = line.partition('=')
+                if sep:
+                    env_vars[key.strip()] = value.strip().strip("\"'")
     return env_vars
 
 
@@ -153,24 +518,25 @@ def analyze_censor_result(result: Dict) -> Tuple[bool, str]:
         return False, f"结果解析失败: {e}"
 
 
+# 命中词行的“标签：词列表”分隔与词列表内的分隔
+_SPLIT_COLON_RE = re.compile(r"[:：]")
+_SPLIT_WORDS_RE = re.compile(r"[、，,\s]+")
+
+
 def extract_hit_words(detail: str) -> List[str]:
     """从解析后的详情文本中提取命中词汇列表。"""
-    hits: List[str] = []
+    # dict 作有序集合：去重并保持首次出现顺序
+    hits: Dict[str, None] = {}
     for line in detail.split("\n"):
         s = line.strip()
-        if s.startswith("命中词汇") or s.startswith("命中词"):
-            parts = re.split(r"[:：]", s, maxsplit=1)
+        # “命中词汇”也以“命中词”开头，一次判断即可
+        if s.startswith("命中词"):
+            parts = _SPLIT_COLON_RE.split(s, maxsplit=1)
             if len(parts) == 2:
-                words = re.split(r"[、，,\s]+", parts[1].strip())
-                hits.extend([w for w in words if w])
-    # 去重保持顺序
-    seen = set()
-    ordered: List[str] = []
-    for w in hits:
-        if w not in seen:
-            seen.add(w)
-            ordered.append(w)
-    return ordered
+                for w in _SPLIT_WORDS_RE.split(parts[1].strip()):
+                    if w:
+                        hits[w] = None
+    return list(hits)
 
 
 def batch_censor_directory(
@@ -182,16 +548,29 @@ def batch_censor_directory(
     repair_model: str = "ernie-4.5-turbo-128k",
     inplace: bool = False,
     max_rounds: int = 10,
+    max_workers: int = 4,
+    on_result: Optional[Callable[[str, Dict], None]] = None,
+    cache: Optional[CensorCache] = None,
+    keep_intermediate: bool = False,
 ) -> Dict[str, Dict]:
-    """批量审核目录下的文件"""
+    """
+    批量审核目录下的文件（各文件并发处理，max_workers 同时限制在途请求数以免超出接口 QPS）。
+    on_result 在每个文件完成时以 (文件路径, 结果) 在调用线程中调用，便于边审核边落盘。
+    keep_intermediate=True 时在每个文件结束时写出各轮修复中间稿。
+    """
     
     if not directory.exists() or not directory.is_dir():
         raise Exception(f"目录不存在或不是有效目录: {directory}")
     
-    # 获取所有符合条件的文件
-    files_to_check = []
-    for ext in file_extensions:
-        files_to_check.extend(directory.glob(f"*{ext}"))
+    # 获取所有符合条件的文件：单次扫描目录，按扩展名集合过滤（与 glob 一致跳过隐藏文件），按文件名排序
+    exts = {e.lower() for e in file_extensions}
+    with os.scandir(directory) as it:
+        names = [
+            e.name for e in it
+            if not e.name.startswith(".") and os.path.splitext(e.name)[1].lower() in exts and e.is_file()
+        ]
+    names.sort()
+    files_to_check = [directory / name for name in names]
     
     if not files_to_check:
         print(f"[INFO] 目录 {directory} 下没有找到 {file_extensions} 格式的文件")
@@ -201,114 +580,182 @@ def batch_censor_directory(
     print(f"[INFO] 支持的文件格式: {', '.join(file_extensions)}")
     print("-" * 60)
     
-    results = {}
+    total = len(files_to_check)
+    # 内容相同的文件（如重复导出的模板章节）只请求一次审核接口
+    censor_client = _DedupCensor(censor_client)
     
-    for i, file_path in enumerate(files_to_check, 1):
-        print(f"[{i}/{len(files_to_check)}] 正在审核: {file_path.name}")
-        
+    def _run(i: int, file_path: Path) -> Tuple[List[str], Dict]:
+        # 工作线程只把日志缓存下来，由调用线程整段打印：各文件日志不交错，终端输出也不占用工作线程
+        lines = [f"[{i}/{total}] 正在审核: {file_path.name}"]
         try:
-            # 读取文件内容
-            content = read_text_file(file_path)
-            
-            if not content.strip():
-                print(f"  ⚠️  文件为空，跳过审核")
-                results[str(file_path)] = {
-                    "status": "skipped",
-                    "reason": "文件内容为空"
-                }
-                continue
-            
-            print(f"  📄 文件大小: {len(content)} 字符")
-            
-            # 如果内容过长，可能需要分段审核（百度API有长度限制）
-            if len(content) > 10000:
-                print(f"  ⚠️  文件内容较长({len(content)}字符)，建议分段审核")
-            
-            # 审核-修复-复审循环
-            round_idx = 0
-            fixed_path_str = ""
-            current_text = content
-            current_detail = ""
-            current_raw = None
-            while True:
-                print(f"  🔍 正在调用审核接口...")
-                censor_result = censor_client.censor_text(current_text)
-                current_raw = censor_result
-                is_compliant, detail = analyze_censor_result(censor_result)
-                current_detail = detail
-                if is_compliant:
-                    print(f"  ✅ {detail}")
-                    # 通过则根据inplace决定是否写入（若之前有修复过需要落盘）
-                    if round_idx > 0:
-                        if inplace:
-                            file_path.write_text(current_text, encoding="utf-8")
-                            fixed_path_str = str(file_path)
-                        else:
-                            fixed_file = file_path.with_name(file_path.stem + "_修复" + file_path.suffix)
-                            fixed_file.write_text(current_text, encoding="utf-8")
-                            fixed_path_str = str(fixed_file)
-                    results[str(file_path)] = {
-                        "status": "compliant",
-                        "detail": detail,
-                        "raw_result": current_raw,
-                        "fixed_file": fixed_path_str,
-                    }
-                    break
-                # 不合规
-                print(f"  ❌ 审核不通过:")
-                for line in detail.split('\n'):
-                    print(f"     {line}")
-                if not auto_repair or repair_client is None or round_idx >= max_rounds:
-                    # 无法或不再修复，直接返回不合规
-                    results[str(file_path)] = {
-                        "status": "non_compliant",
-                        "detail": detail,
-                        "raw_result": current_raw,
-                        "fixed_file": fixed_path_str,
-                    }
-                    break
-                # 执行修复
-                print(f"  🛠  触发自动修复: 第{round_idx+1}轮 …")
-                try:
-                    hits = extract_hit_words(detail)
-                    fixed_text = auto_repair_text(
-                        repair_client=repair_client,
-                        model=repair_model,
-                        original_text=current_text,
-                        violation_hint=detail,
-                        hit_words=hits,
-                    )
-                    current_text = fixed_text
-                    round_idx += 1
-                    # 中间轮次先落盘为临时文件，便于排查
-                    temp_file = file_path.with_name(f"{file_path.stem}_修复_round{round_idx}{file_path.suffix}")
-                    temp_file.write_text(current_text, encoding="utf-8")
-                    fixed_path_str = str(temp_file)
-                    print(f"  ✅ 修复产生 → {fixed_path_str}，将复审…")
-                except Exception as e:
-                    print(f"  ❌ 修复失败: {e}")
-                    results[str(file_path)] = {
-                        "status": "error",
-                        "detail": f"修复失败: {e}",
-                    }
-                    break
-            
+            result = _censor_file_in_batch(
+                file_path,
+                censor_client,
+                lines.append,
+                auto_repair=auto_repair,
+                repair_client=repair_client,
+                repair_model=repair_model,
+                inplace=inplace,
+                max_rounds=max_rounds,
+                cache=cache,
+                keep_intermediate=keep_intermediate,
+            )
         except Exception as e:
             error_msg = f"处理失败: {e}"
-            print(f"  ❌ {error_msg}")
-            results[str(file_path)] = {
+            lines.append(f"  ❌ {error_msg}")
+            result = {"status": "error", "detail": error_msg}
+        lines.append("")
+        return lines, result
+    
+    results: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as ex:
+        futures = {ex.submit(_run, i, fp): fp for i, fp in enumerate(files_to_check, 1)}
+        for fut in as_completed(futures):
+            lines, result = fut.result()
+            print("\n".join(lines))
+            key = str(futures[fut])
+            results[key] = result
+            if on_result is not None:
+                on_result(key, result)
+    # 结果按文件顺序汇总
+    return {str(fp): results[str(fp)] for fp in files_to_check}
+
+
+# 修复稿文件名标记：第 N 轮修复稿写为 “{stem}_修复_roundN{suffix}”
+_ROUND_MARK = "_修复_round"
+
+
+def _write_repair_rounds(file_path: Path, rounds: List[str], keep_intermediate: bool) -> str:
+    """
+    结束时写出修复稿：keep_intermediate=True 时写出除最后一轮外的各轮中间稿，
+    最后一轮总是写出（未通过时供人工查看），返回其路径；没有修复轮次时返回空串。
+    """
+    if not rounds:
+        return ""
+    template = str(file_path.with_name(f"{file_path.stem}{_ROUND_MARK}{{}}{file_path.suffix}"))
+    if keep_intermediate:
+        for i, text in enumerate(rounds[:-1], 1):
+            Path(template.format(i)).write_text(text, encoding="utf-8")
+    last = Path(template.format(len(rounds)))
+    last.write_text(rounds[-1], encoding="utf-8")
+    return str(last)
+
+
+def _censor_file_in_batch(
+    file_path: Path,
+    censor_client: BaiduTextCensor,
+    log: Callable[[str], None],
+    *,
+    auto_repair: bool,
+    repair_client: Optional["BaiduErnieClient"],
+    repair_model: str,
+    inplace: bool,
+    max_rounds: int,
+    cache: Optional[CensorCache] = None,
+    keep_intermediate: bool = False,
+) -> Dict:
+    """
+    批量模式下审核单个文件（含修复-复审循环），返回该文件的结果记录。
+    各轮修复稿只保存在内存中，结束时写出（见 _write_repair_rounds）。
+    """
+    # 读取文件内容（空文件只需一次 stat，不必打开读取）
+    content = read_text_file(file_path) if file_path.stat().st_size else ""
+    
+    if not content.strip():
+        log(f"  ⚠️  文件为空，跳过审核")
+        return {
+            "status": "skipped",
+            "reason": "文件内容为空"
+        }
+    
+    log(f"  📄 文件大小: {len(content)} 字符")
+    
+    # 超出接口长度上限时 censor_text 会按段落分段审核
+    if len(content) > 10000:
+        log(f"  ⚠️  文件内容较长({len(content)}字符)，将按段落分段审核")
+    
+    # 审核-修复-复审循环
+    round_idx = 0
+    rounds: List[str] = []  # 各轮修复稿，第 i 项对应 round{i+1}
+    current_text = content
+    # 本文件已审核过（且不合规）的文本摘要：修复结果与之前某轮相同说明修复不再收敛
+    seen = {text_digest(content)}
+    while True:
+        censor_result = censor_with_cache(censor_client, current_text, cache, log)
+        is_compliant, detail = analyze_censor_result(censor_result)
+        if is_compliant:
+            log(f"  ✅ {detail}")
+            fixed_path_str = ""
+            # 通过则根据inplace决定是否写入（若之前有修复过需要落盘）
+            if round_idx > 0:
+                if keep_intermediate:
+                    _write_repair_rounds(file_path, rounds, True)
+                if inplace:
+                    file_path.write_text(current_text, encoding="utf-8")
+                    fixed_path_str = str(file_path)
+                else:
+                    fixed_file = file_path.with_name(file_path.stem + "_修复" + file_path.suffix)
+                    fixed_file.write_text(current_text, encoding="utf-8")
+                    fixed_path_str = str(fixed_file)
+            return {
+                "status": "compliant",
+                "detail": detail,
+                "raw_result": censor_result,
+                "fixed_file": fixed_path_str,
+            }
+        # 不合规
+        log(f"  ❌ 审核不通过:")
+        for line in detail.split('\n'):
+            log(f"     {line}")
+        if not auto_repair or repair_client is None or round_idx >= max_rounds:
+            # 无法或不再修复，直接返回不合规
+            return {
+                "status": "non_compliant",
+                "detail": detail,
+                "raw_result": censor_result,
+                "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
+            }
+        # 执行修复
+        log(f"  🛠  触发自动修复: 第{round_idx+1}轮 …")
+        try:
+            hits = extract_hit_words(detail)
+            fixed_text = auto_repair_text(
+                repair_client=repair_client,
+                model=repair_model,
+                original_text=current_text,
+                violation_hint=detail,
+                hit_words=hits,
+            )
+            digest = text_digest(fixed_text)
+            if digest in seen:
+                log(f"  ⛔ 修复结果与此前某轮相同，不再收敛，提前结束")
+                return {
+                    "status": "non_compliant",
+                    "detail": detail,
+                    "raw_result": censor_result,
+                    "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
+                    "repair_stuck": True,
+                }
+            seen.add(digest)
+            current_text = fixed_text
+            rounds.append(fixed_text)
+            round_idx += 1
+            log(f"  ✅ 第{round_idx}轮修复完成，将复审…")
+        except RepairTooLargeError as e:
+            log(f"  ⛔ {e}")
+            return {
+                "status": "non_compliant",
+                "detail": detail,
+                "raw_result": censor_result,
+                "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
+                "repair_skipped": str(e),
+            }
+        except Exception as e:
+            log(f"  ❌ 修复失败: {e}")
+            return {
                 "status": "error",
-                "detail": error_msg
+                "detail": f"修复失败: {e}",
             }
-        
-        # 请求间隔，避免频率限制
-        if i < len(files_to_check):
-            print(f"  ⏱️  等待2秒后继续...")
-            time.sleep(2)
-        
-        print()
-    
-    return results
 
 
 def print_summary(results: Dict[str, Dict]):
@@ -317,11 +764,19 @@ def print_summary(results: Dict[str, Dict]):
     print("📊 审核结果汇总")
     print("=" * 60)
     
+    # 单次遍历完成计数，并顺带收集不合规文件
     total = len(results)
-    compliant = sum(1 for r in results.values() if r["status"] == "compliant")
-    non_compliant = sum(1 for r in results.values() if r["status"] == "non_compliant")
-    errors = sum(1 for r in results.values() if r["status"] == "error")
-    skipped = sum(1 for r in results.values() if r["status"] == "skipped")
+    counts: Counter = Counter()
+    failed: List[Tuple[str, Dict]] = []
+    for file_path, result in results.items():
+        status = result["status"]
+        counts[status] += 1
+        if status == "non_compliant":
+            failed.append((file_path, result))
+    compliant = counts["compliant"]
+    non_compliant = counts["non_compliant"]
+    errors = counts["error"]
+    skipped = counts["skipped"]
     
     print(f"总文件数: {total}")
     print(f"✅ 合规: {compliant}")
@@ -332,13 +787,12 @@ def print_summary(results: Dict[str, Dict]):
     if non_compliant > 0:
         print("\n🚨 不合规文件详情:")
         print("-" * 40)
-        for file_path, result in results.items():
-            if result["status"] == "non_compliant":
-                print(f"📁 {Path(file_path).name}")
-                print(f"   {result['detail']}")
-                if result.get("fixed_file"):
-                    print(f"   🛠  修复文件: {result['fixed_file']}")
-                print()
+        for file_path, result in failed:
+            print(f"📁 {Path(file_path).name}")
+            print(f"   {result['detail']}")
+            if result.get("fixed_file"):
+                print(f"   🛠  修复文件: {result['fixed_file']}")
+            print()
 
 
 def censor_single_file(
@@ -349,31 +803,36 @@ def censor_single_file(
     repair_model: str = "ernie-4.5-turbo-128k",
     inplace: bool = False,
     max_rounds: int = 10,
+    cache: Optional[CensorCache] = None,
+    keep_intermediate: bool = False,
 ) -> Dict[str, Dict]:
-    """审核单个文件（支持可选自动修复）。"""
+    """审核单个文件（支持可选自动修复；修复稿的落盘方式同 _censor_file_in_batch）。"""
     if not file_path.exists() or not file_path.is_file():
         raise Exception(f"文件不存在或不可读: {file_path}")
 
     print(f"[FILE] 审核文件: {file_path.name}")
-    content = read_text_file(file_path)
+    content = read_text_file(file_path) if file_path.stat().st_size else ""
     if not content.strip():
         print("  ⚠️  文件为空，跳过审核")
         return {str(file_path): {"status": "skipped", "reason": "文件内容为空"}}
 
     print(f"  📄 文件大小: {len(content)} 字符")
     if len(content) > 10000:
-        print(f"  ⚠️  文件内容较长({len(content)}字符)，建议分段审核")
+        print(f"  ⚠️  文件内容较长({len(content)}字符)，将按段落分段审核")
 
     # 审核-修复-复审循环
     current_text = content
-    fixed_path_str = ""
+    rounds: List[str] = []
+    seen = {text_digest(content)}
     for round_idx in range(max_rounds + 1):
-        print("  🔍 正在调用审核接口…")
-        censor_result = censor_client.censor_text(current_text)
+        censor_result = censor_with_cache(censor_client, current_text, cache)
         is_compliant, detail = analyze_censor_result(censor_result)
         if is_compliant:
             print(f"  ✅ {detail}")
+            fixed_path_str = ""
             if round_idx > 0:
+                if keep_intermediate:
+                    _write_repair_rounds(file_path, rounds, True)
                 if inplace:
                     file_path.write_text(current_text, encoding="utf-8")
                     fixed_path_str = str(file_path)
@@ -396,22 +855,165 @@ def censor_single_file(
                 "status": "non_compliant",
                 "detail": detail,
                 "raw_result": censor_result,
-                "fixed_file": fixed_path_str,
+                "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
             }}
         print(f"  🛠  触发自动修复: 第{round_idx+1}轮 …")
         hits = extract_hit_words(detail)
-        fixed_text = auto_repair_text(
-            repair_client=repair_client,
-            model=repair_model,
-            original_text=current_text,
-            violation_hint=detail,
-            hit_words=hits,
-        )
+        try:
+            fixed_text = auto_repair_text(
+                repair_client=repair_client,
+                model=repair_model,
+                original_text=current_text,
+                violation_hint=detail,
+                hit_words=hits,
+            )
+        except RepairTooLargeError as e:
+            print(f"  ⛔ {e}")
+            return {str(file_path): {
+                "status": "non_compliant",
+                "detail": detail,
+                "raw_result": censor_result,
+                "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
+                "repair_skipped": str(e),
+            }}
+        digest = text_digest(fixed_text)
+        if digest in seen:
+            print("  ⛔ 修复结果与此前某轮相同，不再收敛，提前结束")
+            return {str(file_path): {
+                "status": "non_compliant",
+                "detail": detail,
+                "raw_result": censor_result,
+                "fixed_file": _write_repair_rounds(file_path, rounds, keep_intermediate),
+                "repair_stuck": True,
+            }}
+        seen.add(digest)
         current_text = fixed_text
-        temp_file = file_path.with_name(f"{file_path.stem}_修复_round{round_idx+1}{file_path.suffix}")
-        temp_file.write_text(current_text, encoding="utf-8")
-        fixed_path_str = str(temp_file)
-        print(f"  ✅ 修复产生 → {fixed_path_str}，将复审…")
+        rounds.append(fixed_text)
+        print(f"  ✅ 第{round_idx+1}轮修复完成，将复审…")
+
+
+# 自动修复提示词中的固定部分
+_REPAIR_SYSTEM_MSG = {
+    "role": "system",
+    "content": (
+        "你是文本合规编辑。\n"
+        "只允许对命中违规词所在的句子做最小幅度改写或同义替换, 其他句子一字不动。\n"
+        "保持原有信息量与时间顺序与因果关系不变, 不新增人物与事件, 不扩写。\n"
+        "返回完整正文, 其余位置保持与原文完全一致, 不加解释。"
+    ),
+}
+_REPAIR_REQUIREMENT = (
+    "\n\n【修订要求】\n请将上述命中词在原文中替换为不违规但语义相近的表达, 或对包含它们的整句进行改写以移除该词。\n只改这些句子, 其他部分保持完全不变。\n"
+    "\n【待修订正文】\n"
+)
+
+
+# 整篇改写的长度上限：超出后模型输出（max_tokens=6000）装不下全文，回写会截断正文
+_REPAIR_MAX_CHARS = 10000
+
+
+class RepairTooLargeError(Exception):
+    """文本过长且无法按句定位命中词，放弃自动修复"""
+
+
+# 句子级修复：只把含命中词的句子编号发给模型，改写结果按编号拼回原文
+_SENTENCE_REPAIR_SYSTEM_MSG = {
+    "role": "system",
+    "content": (
+        "你是文本合规编辑。\n"
+        "输入是若干带编号的句子, 请对每个句子做最小幅度改写或同义替换以移除命中词, 不改变句意与叙事信息, 不扩写。\n"
+        "只返回 JSON 数组, 形如 [{\"id\": 编号, \"text\": \"改写后的句子\"}], 编号与输入一一对应, 不加解释。"
+    ),
+}
+_SENTENCE_REPAIR_REQUIREMENT = (
+    "\n\n【修订要求】\n请改写下列句子以移除上述命中词, 保持语义相近, 按要求的 JSON 格式返回。\n"
+    "\n【待修订句子】\n"
+)
+# 句末标点或换行之后断句；紧随的右引号/括号归入前一句
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？!?…\n])(?![”’」』）)])")
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.S)
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句末标点或换行断句，保留标点与换行（拼回即原文）"""
+    return _SENTENCE_SPLIT_RE.split(text)
+
+
+@lru_cache(maxsize=256)
+def _repair_prompt_head(
+    hit_words: Tuple[str, ...],
+    violation_hint: str,
+    requirement: str = _REPAIR_REQUIREMENT,
+) -> str:
+    """正文之前的提示部分；同一组命中词与提示在批量修复中反复出现，只拼接一次"""
+    return "".join((
+        "【命中词汇】\n", "、".join(hit_words),
+        "\n\n【不合规提示】\n", violation_hint,
+        requirement,
+    ))
+
+
+def _response_text(data) -> str:
+    """从对话接口返回中取出文本（兼容多种返回结构）"""
+    if isinstance(data, dict):
+        if "result" in data and isinstance(data["result"], str):
+            return data["result"]
+        if "choices" in data:
+            choice = data["choices"][0]
+            msg = choice.get("message") or {}
+            if isinstance(msg, dict) and isinstance(msg.get("content"), str):
+                return msg["content"]
+    return str(data)
+
+
+def _repair_hit_sentences(
+    repair_client: "BaiduErnieClient",
+    model: str,
+    original_text: str,
+    violation_hint: str,
+    hit_words: List[str],
+) -> Optional[str]:
+    """
+    只改写含命中词的句子并拼回原文。
+    原文中找不到命中词（如模型类违规）或返回无法解析时返回 None，由调用方退回整篇改写。
+    """
+    sentences = split_sentences(original_text)
+    targets = {i for i, sent in enumerate(sentences) if any(w in sent for w in hit_words)}
+    if not targets:
+        return None
+    payload = _json_dumps([{"id": i, "text": sentences[i]} for i in sorted(targets)], indent=True)
+    head = _repair_prompt_head(tuple(hit_words), violation_hint, _SENTENCE_REPAIR_REQUIREMENT)
+    data = repair_client.chat_completions(
+        model=model,
+        messages=[_SENTENCE_REPAIR_SYSTEM_MSG, {"role": "user", "content": head + payload}],
+        temperature=0.4,
+        top_p=0.85,
+        max_tokens=6000,
+    )
+    m = _JSON_ARRAY_RE.search(_response_text(data))
+    if m is None:
+        return None
+    try:
+        items = _json_loads(m.group(0))
+    except ValueError:
+        return None
+    replaced = 0
+    for item in items if isinstance(items, list) else ():
+        if not isinstance(item, dict):
+            continue
+        i, text = item.get("id"), item.get("text")
+        if i not in targets or not isinstance(text, str) or not text.strip():
+            continue
+        # 保留原句首尾空白（缩进、换行），段落结构不受模型输出影响
+        sent = sentences[i]
+        body = sent.strip()
+        lead = sent[:len(sent) - len(sent.lstrip())]
+        tail = sent[len(lead) + len(body):]
+        sentences[i] = lead + text.strip() + tail
+        replaced += 1
+    if not replaced:
+        return None
+    return "".join(sentences)
 
 
 def auto_repair_text(
@@ -420,23 +1022,26 @@ def auto_repair_text(
     original_text: str,
     violation_hint: str,
     hit_words: Optional[List[str]] = None,
+    sentence_level: bool = True,
 ) -> str:
-    """使用大模型自动重写文本为合规版本。"""
-    system_prompt = (
-        "你是文本合规编辑。\n"
-        "只允许对命中违规词所在的句子做最小幅度改写或同义替换, 其他句子一字不动。\n"
-        "保持原有信息量与时间顺序与因果关系不变, 不新增人物与事件, 不扩写。\n"
-        "返回完整正文, 其余位置保持与原文完全一致, 不加解释。"
-    )
-    hit_text = "、".join(hit_words) if hit_words else ""
-    user_prompt = (
-        "【命中词汇】\n" + hit_text +
-        "\n\n【不合规提示】\n" + violation_hint +
-        "\n\n【修订要求】\n请将上述命中词在原文中替换为不违规但语义相近的表达, 或对包含它们的整句进行改写以移除该词。\n只改这些句子, 其他部分保持完全不变。\n"+
-        "\n【待修订正文】\n" + original_text
-    )
+    """
+    使用大模型自动重写文本为合规版本。
+    有命中词时优先只改写含命中词的句子（输入 token 少得多）；无法定位或解析失败时整篇改写。
+    需要整篇改写但文本超过 _REPAIR_MAX_CHARS 时抛出 RepairTooLargeError。
+    """
+    if sentence_level and hit_words:
+        repaired = _repair_hit_sentences(repair_client, model, original_text, violation_hint, hit_words)
+        if repaired is not None:
+            return repaired
+    if len(original_text) > _REPAIR_MAX_CHARS:
+        raise RepairTooLargeError(
+            f"文本过长({len(original_text)}字符 > {_REPAIR_MAX_CHARS})且无法按句定位命中词，跳过自动修复"
+        )
+    # 提示部分按 (命中词, 提示) 复用，正文只复制一次
+    head = _repair_prompt_head(tuple(hit_words) if hit_words else (), violation_hint)
+    user_prompt = head + original_text
     messages = [
-        {"role": "system", "content": system_prompt},
+        _REPAIR_SYSTEM_MSG,
         {"role": "user", "content": user_prompt},
     ]
     data = repair_client.chat_completions(
@@ -446,40 +1051,42 @@ def auto_repair_text(
         top_p=0.85,
         max_tokens=6000,
     )
-    # 兼容多种返回结构
-    if isinstance(data, dict):
-        if "result" in data and isinstance(data["result"], str):
-            return data["result"]
-        if "choices" in data:
-            choice = data["choices"][0]
-            msg = choice.get("message") or {}
-            if isinstance(msg, dict) and isinstance(msg.get("content"), str):
-                return msg["content"]
-    return str(data)
+    return _response_text(data)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="百度AI文本审核批量检测工具",
+        epilog="示例: python text_censor_batch.py ./chapters --auto-repair --repair-model=ernie-4.5-turbo-128k --max-rounds=10",
+    )
+    parser.add_argument("path", type=Path, help="目录或单个文件")
+    parser.add_argument("--auto-repair", action="store_true")
+    parser.add_argument("--inplace", action="store_true")
+    parser.add_argument("--repair-model", default="ernie-4.5-turbo-128k")
+    parser.add_argument("--max-rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--qps", type=float, default=2.0)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--keep-intermediate", action="store_true", help="保留各轮修复中间稿文件")
+    parser.add_argument(
+        "--cache-file", type=Path, default=_DEFAULT_CENSOR_CACHE_PATH,
+        help="审核结论缓存文件（默认脚本所在目录下的 censor_cache.jsonl）",
+    )
+    return parser.parse_args(argv)
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("用法: python text_censor_batch.py <路径> [--auto-repair] [--inplace] [--repair-model=ernie-4.5-turbo-128k] [--max-rounds=10]")
-        print("说明: <路径> 可为目录或单个文件")
-        print("示例: python text_censor_batch.py ./chapters --auto-repair --repair-model=ernie-4.5-turbo-128k --max-rounds=10")
-        sys.exit(1)
-
-    # 简易参数解析
-    target_path = Path(sys.argv[1])
-    auto_repair = any(arg == "--auto-repair" for arg in sys.argv[2:])
-    inplace = any(arg == "--inplace" for arg in sys.argv[2:])
-    repair_model = "ernie-4.5-turbo-128k"
-    max_rounds = 10
-    for arg in sys.argv[2:]:
-        if arg.startswith("--repair-model="):
-            repair_model = arg.split("=", 1)[1] or repair_model
-        if arg.startswith("--max-rounds="):
-            try:
-                max_rounds = int(arg.split("=", 1)[1])
-            except Exception:
-                pass
+    args = parse_args(sys.argv[1:])
+    target_path = args.path
+    auto_repair = args.auto_repair
+    inplace = args.inplace
+    repair_model = args.repair_model
+    max_rounds = args.max_rounds
+    max_workers = max(1, args.workers)
+    qps = args.qps
+    use_cache = not args.no_cache
+    keep_intermediate = args.keep_intermediate
     
     print("🔍 百度AI文本审核批量检测工具")
     print("=" * 60)
@@ -512,36 +1119,54 @@ def main():
         print(f"🛠  自动修复已开启，模型: {repair_model}")
     print()
     
+    cache: Optional[CensorCache] = None
     try:
         # 初始化审核客户端
-        censor_client = BaiduTextCensor(api_key, secret_key)
+        censor_client = BaiduTextCensor(api_key, secret_key, qps=qps)
+        # 审核结论缓存（7 天有效），未改动的文件重跑时不再请求接口
+        cache = CensorCache(args.cache_file) if use_cache else None
 
         repair_client = None
         if auto_repair and BaiduErnieClient is not None and baidu_api_key:
             # 复用项目ERNIE客户端，支持直接用 BAIDU_API_KEY
             repair_client = BaiduErnieClient()
         
-        # 执行批量审核
-        if target_path.is_file():
-            results = censor_single_file(
-                target_path,
-                censor_client,
-                auto_repair=auto_repair,
-                repair_client=repair_client,
-                repair_model=repair_model,
-                inplace=inplace,
-                max_rounds=max_rounds,
-            )
-        else:
-            results = batch_censor_directory(
-                target_path,
-                censor_client,
-                auto_repair=auto_repair,
-                repair_client=repair_client,
-                repair_model=repair_model,
-                inplace=inplace,
-                max_rounds=max_rounds,
-            )
+        # 逐文件追加写出 NDJSON，中途中断也保留已完成的结果
+        stream_file = Path("censor_results.ndjson")
+        
+        def _stream_result(path: str, record: Dict) -> None:
+            stream.write(_json_dumps({"path": path, **record}) + "\n")
+        
+        with open(stream_file, 'w', encoding='utf-8', buffering=1) as stream:
+            # 执行批量审核
+            if target_path.is_file():
+                results = censor_single_file(
+                    target_path,
+                    censor_client,
+                    auto_repair=auto_repair,
+                    repair_client=repair_client,
+                    repair_model=repair_model,
+                    inplace=inplace,
+                    max_rounds=max_rounds,
+                    cache=cache,
+                    keep_intermediate=keep_intermediate,
+                )
+                for path, record in results.items():
+                    _stream_result(path, record)
+            else:
+                results = batch_censor_directory(
+                    target_path,
+                    censor_client,
+                    auto_repair=auto_repair,
+                    repair_client=repair_client,
+                    repair_model=repair_model,
+                    inplace=inplace,
+                    max_rounds=max_rounds,
+                    max_workers=max_workers,
+                    on_result=_stream_result,
+                    cache=cache,
+                    keep_intermediate=keep_intermediate,
+                )
         
         # 打印汇总
         print_summary(results)
@@ -549,12 +1174,15 @@ def main():
         # 保存详细结果到JSON文件
         result_file = Path("censor_results.json")
         with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        print(f"\n📄 详细结果已保存到: {result_file.absolute()}")
+            f.write(_json_dumps(results, indent=True))
+        print(f"\n📄 详细结果已保存到: {result_file.absolute()}（逐文件记录: {stream_file.absolute()}）")
         
     except Exception as e:
         print(f"❌ 执行失败: {e}")
         sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
@@ -5,23 +5,42 @@
 
 功能：
 - 审核单个文件，打印可读进度
-- 审核不通过时，调用大模型（默认 ernie-4.5-turbo-128k）进行合规化重写
+- 审核不通过时，先按可选的固定替换规则修正并复审，仍不通过再调用大模型（默认 ernie-4.5-turbo-128k）进行合规化重写
 - 支持就地覆盖或输出到副本
+- 可选的审核结论缓存（按正文 sha256），重跑未改动的文件不再请求接口
+- 多文件并发处理（线程池，接口调用以网络等待为主）
 """
 
 from __future__ import annotations
 
 import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 
 from text_censor_batch import (
     BaiduTextCensor,
+    CensorCache,
     analyze_censor_result,
     auto_repair_text,
+    censor_with_cache,
+    text_digest,
 )
 from novel_runner.client import BaiduErnieClient
 
+# 审核与修复客户端共享的连接池大小（process_files 的各工作线程复用 keep-alive 连接）
+_HTTP_POOL_SIZE = 16
+# 单个服务实例内记住的修复结果条数
+_REPAIR_MEMO_SIZE = 128
+# 非就地修复生成的副本名标记，目录处理时跳过，避免把副本再审一遍
+_REPAIR_COPY_MARK = "_修复"
+
 
 class TextCensorAndRepairService:
     """文本审核+自动修复一体化服务。
@@ -31,6 +50,9 @@ class TextCensorAndRepairService:
       - llm_api_key: 大模型调用所用的密钥（不传则读取 BAIDU_API_KEY）
       - llm_model: 修复使用的模型，默认 'ernie-4.5-turbo-128k'
       - verbose: 是否打印过程信息
+      - cache_path: 审核结论缓存文件（JSONL），不传则读取 CENSOR_CACHE，均未设置时不缓存
+      - censor_qps: 审核接口限速（次/秒），多文件并发时避免触发接口 QPS 限制；不传则不主动限速
+      - patch_rules: 固定替换规则 {词: 替换词}，命中后先本地替换再复审，通过则不调用大模型
     """
 
     def __init__(
@@ -40,31 +62,80 @@ class TextCensorAndRepairService:
         llm_api_key: Optional[str] = None,
         llm_model: str = "ernie-4.5-turbo-128k",
         verbose: bool = True,
+        cache_path: Optional[Path] = None,
+        patch_rules: Optional[Dict[str, str]] = None,
+        censor_qps: Optional[float] = None,
     ) -> None:
         self.verbose = verbose
-        self.censor_client = BaiduTextCensor(text_api_key, text_secret_key)
+        # process_files 的工作线程把日志暂存在这里，由调用线程按文件整段打印
+        self._log_buffer = threading.local()
+        # 两个客户端共用一个 Session：令牌、审核与大模型请求都复用同一组 keep-alive 连接
+        self._http = requests.Session()
+        self._http.mount(
+            "https://", HTTPAdapter(pool_connections=2, pool_maxsize=_HTTP_POOL_SIZE)
+        )
+        self.censor_client = BaiduTextCensor(
+            text_api_key, text_secret_key, qps=censor_qps, session=self._http
+        )
         self.repair_model = llm_model
+        cache_path = cache_path or os.getenv("CENSOR_CACHE")
+        self.cache: Optional[CensorCache] = (
+            CensorCache(Path(cache_path).expanduser()) if cache_path else None
+        )
+        # 所有规则编译成一个交替正则，一趟扫描完成替换；长词优先，避免被其前缀抢先匹配
+        self._patch_rules = dict(patch_rules or {})
+        self._patch_re: Optional[re.Pattern[str]] = None
+        if self._patch_rules:
+            words = sorted(self._patch_rules, key=len, reverse=True)
+            self._patch_re = re.compile("|".join(map(re.escape, words)))
+
+        # 同一正文+同一违规提示（如重复的模板章节）在本实例内只调用一次大模型
+        self._repair_memo: "OrderedDict[bytes, str]" = OrderedDict()
+        self._repair_memo_lock = threading.Lock()
 
         # 允许外部通过 env 提供 BAIDU_API_KEY
         api_key = llm_api_key or os.getenv("BAIDU_API_KEY", "")
         self.repair_client: Optional[BaiduErnieClient]
         if api_key:
-            self.repair_client = BaiduErnieClient(api_key=api_key)
+            self.repair_client = BaiduErnieClient(api_key=api_key, session=self._http)
         else:
             self.repair_client = None
 
+    def close(self) -> None:
+        """关闭共享连接池与审核结论缓存"""
+        self.censor_client.close()
+        if self.repair_client is not None:
+            self.repair_client.close()
+        self._http.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self) -> "TextCensorAndRepairService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
     def _print(self, message: str) -> None:
         if self.verbose:
-            print(message, flush=True)
+            lines = getattr(self._log_buffer, "lines", None)
+            if lines is not None:
+                lines.append(message)
+            else:
+                print(message, flush=True)
 
-    def censor_file(self, file_path: Path) -> Dict[str, Any]:
-        """仅执行审核，返回原始结果与解析后的结论。"""
-        if not file_path.exists() or not file_path.is_file():
-            raise FileNotFoundError(f"文件不存在或不可读: {file_path}")
-        content = file_path.read_text(encoding="utf-8")
+    def _read_for_censor(self, file_path: Path) -> str:
+        # 直接打开读取，不再先 exists()/is_file() 各 stat 一次
+        try:
+            content = file_path.read_text(encoding="utf-8")
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError) as e:
+            raise FileNotFoundError(f"文件不存在或不可读: {file_path}") from e
         self._print(f"[FILE] 审核文件: {file_path.name}")
         self._print(f"  📄 文件大小: {len(content)} 字符")
-        result = self.censor_client.censor_text(content)
+        return content
+
+    @staticmethod
+    def _censor_info(content: str, result: Dict[str, Any]) -> Dict[str, Any]:
         is_ok, detail = analyze_censor_result(result)
         return {
             "ok": is_ok,
@@ -73,16 +144,72 @@ class TextCensorAndRepairService:
             "content": content,
         }
 
+    def censor_file(self, file_path: Path) -> Dict[str, Any]:
+        """仅执行审核，返回原始结果与解析后的结论。"""
+        content = self._read_for_censor(file_path)
+        result = censor_with_cache(self.censor_client, content, self.cache, self._print)
+        return self._censor_info(content, result)
+
+    def censor_files(self, paths: List[Path]) -> List[Dict[str, Any]]:
+        """批量审核多个文件，按输入顺序返回与 censor_file 相同结构的结果。
+
+        内容完全相同的文件只请求一次接口。各文件仍分别提交审核：
+        拼接成一次请求时，任一文件违规都会让整批不通过且无法可靠地归属到具体文件。
+        """
+        results: Dict[bytes, Dict[str, Any]] = {}
+        infos: List[Dict[str, Any]] = []
+        for file_path in paths:
+            content = self._read_for_censor(file_path)
+            key = text_digest(content)
+            result = results.get(key)
+            if result is None:
+                result = results[key] = censor_with_cache(
+                    self.censor_client, content, self.cache, self._print
+                )
+            else:
+                self._print("  ♻️ 内容与已审核文件相同，复用结果")
+            infos.append(self._censor_info(content, result))
+        return infos
+
     def repair(self, original_text: str, violation_hint: str) -> str:
-        """调用大模型修复文本。"""
+        """调用大模型修复文本（本实例内相同输入复用上次的修复结果）。"""
         if self.repair_client is None:
             raise RuntimeError("未配置 BAIDU_API_KEY，无法执行自动修复")
-        return auto_repair_text(
+        key = text_digest(f"{original_text}\x1e{violation_hint}")
+        with self._repair_memo_lock:
+            fixed_text = self._repair_memo.get(key)
+            if fixed_text is not None:
+                self._repair_memo.move_to_end(key)
+        if fixed_text is not None:
+            self._print("  ♻️ 相同内容已修复过，复用修复结果")
+            return fixed_text
+        fixed_text = auto_repair_text(
             repair_client=self.repair_client,
             model=self.repair_model,
             original_text=original_text,
             violation_hint=violation_hint,
         )
+        with self._repair_memo_lock:
+            self._repair_memo[key] = fixed_text
+            if len(self._repair_memo) > _REPAIR_MEMO_SIZE:
+                self._repair_memo.popitem(last=False)
+        return fixed_text
+
+    def _apply_patch_rules(self, info: Dict[str, Any]) -> Optional[str]:
+        """按固定规则替换并复审：通过则返回替换后的正文；否则把替换结果与新结论写回 info 交给大模型。"""
+        if self._patch_re is None:
+            return None
+        patched = self._patch_re.sub(lambda m: self._patch_rules[m.group(0)], info["content"])
+        if patched == info["content"]:
+            return None
+        self._print("  🔧 已按替换规则修正，重新审核…")
+        result = censor_with_cache(self.censor_client, patched, self.cache, self._print)
+        is_ok, detail = analyze_censor_result(result)
+        if is_ok:
+            self._print("  ✅ 替换后审核通过，跳过大模型修复")
+            return patched
+        info["content"], info["detail"] = patched, detail
+        return None
 
     def process_file(self, file_path: Path, inplace: bool = True) -> Dict[str, Any]:
         """审核并在必要时修复，返回最终状态。"""
@@ -93,23 +220,84 @@ class TextCensorAndRepairService:
 
         # 审核不通过，尝试修复
         self._print("  ❌ 审核不通过，准备自动修复…")
-        self._print("     " + info["detail"].replace("\n", "\n     "))
-        fixed_text = self.repair(info["content"], info["detail"])
+        detail = info["detail"]
+        if self.verbose:
+            self._print("     " + detail.replace("\n", "\n     "))
+        fixed_text = self._apply_patch_rules(info)
+        if fixed_text is None:
+            fixed_text = self.repair(info["content"], info["detail"])
 
         if inplace:
             file_path.write_text(fixed_text, encoding="utf-8")
             saved_path = file_path
         else:
-            saved_path = file_path.with_suffix(file_path.suffix.replace(".md", "") + "_修复.md")
+            saved_path = file_path.with_name(f"{file_path.stem}{_REPAIR_COPY_MARK}{file_path.suffix}")
             saved_path.write_text(fixed_text, encoding="utf-8")
 
         self._print(f"  ✅ 修复完成 → {saved_path}")
         return {
             "status": "fixed",
             "path": str(saved_path),
-            "detail": info["detail"],
+            "detail": detail,
         }
 
+    def process_files(
+        self,
+        paths: List[Path],
+        inplace: bool = True,
+        max_workers: int = 4,
+    ) -> List[Dict[str, Any]]:
+        """并发审核（并修复）多个文件，按输入顺序返回各文件的 process_file 结果。
+
+        单个文件出错不影响其他文件，记为 status=error。
+        """
+
+        def _run(file_path: Path) -> Tuple[List[str], Dict[str, Any]]:
+            lines: List[str] = []
+            self._log_buffer.lines = lines
+            try:
+                result = self.process_file(file_path, inplace=inplace)
+            except Exception as e:
+                self._print(f"  ❌ 处理失败: {e}")
+                result = {"status": "error", "path": str(file_path), "detail": str(e)}
+            finally:
+                self._log_buffer.lines = None
+            return lines, result
+
+        if not paths:
+            return []
+        results: Dict[int, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as ex:
+            futures = {ex.submit(_run, fp): i for i, fp in enumerate(paths)}
+            for fut in as_completed(futures):
+                lines, result = fut.result()
+                for line in lines:
+                    self._print(line)
+                results[futures[fut]] = result
+        return [results[i] for i in range(len(paths))]
+
+    def process_directory(
+        self,
+        directory: Path,
+        file_extensions: Tuple[str, ...] = (".md", ".txt"),
+        inplace: bool = True,
+        max_workers: int = 4,
+    ) -> List[Dict[str, Any]]:
+        """处理目录下所有指定扩展名的文件（按文件名排序），跳过隐藏文件与修复副本。"""
+        # 单次 scandir 取得文件列表，d_type 判断文件类型无需逐个 stat
+        exts = {e.lower() for e in file_extensions}
+        names = []
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.name.startswith("."):
+                    continue
+                stem, ext = os.path.splitext(e.name)
+                # 只跳过 process_file 写出的 “{stem}_修复{suffix}” 副本，标题中含“_修复”的正文照常处理
+                if ext.lower() in exts and not stem.endswith(_REPAIR_COPY_MARK) and e.is_file():
+                    names.append(e.name)
+        names.sort()
+        return self.process_files([directory / name for name in names], inplace, max_workers)
+
 
 __all__ = ["TextCensorAndRepairService"]
 